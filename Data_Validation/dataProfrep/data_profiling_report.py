@@ -5,6 +5,9 @@ import seaborn as sns
 import io
 import base64
 
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+from Data_Validation.dataquame.sketches import HyperLogLog
+
 # Utility to format memory size
 def format_memory_size(bytes_size):
     """Format the memory size into KB, MB, GB, or TB based on size."""
@@ -20,36 +23,61 @@ def format_memory_size(bytes_size):
         return f"{bytes_size / (1024 ** 4):.2f} TB"
 
 # Function to generate column statistics
-def generate_statistics(df):
-    """Generate detailed statistics for each column."""
-    report = []
-    for column in df.columns:
-        data = df[column]
-        n_rows = len(data)
-        distinct_values = data.nunique()
-        memory_size = data.memory_usage(deep=True)
-
-        stats = {
-            "Column Name": column,
-            "Missing Cells": data.isnull().sum(),
-            "Missing Cells (%)": f"{(data.isnull().sum() / n_rows) * 100:.2f}%",
-            "Duplicate Values": data.duplicated().sum(),
-            "Duplicate Values (%)": f"{(data.duplicated().sum() / n_rows) * 100:.2f}%",
-            "Distinct Values": distinct_values,
-            "Distinct Values (%)": f"{(distinct_values / n_rows) * 100:.2f}%",
-            "Memory Size": format_memory_size(memory_size),
-        }
-        report.append(stats)
-    return report
+def generate_statistics(df, distinct_error=None, context=None):
+    """
+    Generate the missing, duplicate, distinct and memory statistics of every column in a few
+    frame-level passes, estimating distinct counts when distinct_error is given.
+
+    Missing cells are counted in one pass over the frame and memory in another. Each column's
+    distinct values are found once, through the AnalysisContext of df shared with the metrics when
+    one is given, or sketched with a HyperLogLog without gathering them when distinct_error is
+    given. Duplicates follow from the distinct and missing counts: every value past the first
+    occurrence of each distinct value is a duplicate, see AnalysisContext.duplicated_count.
+
+    Returns:
+        pd.DataFrame: One row per column, indexed by column name, with the counts and their
+            percentage of rows and the memory size in bytes. attrs["distinct_approximate"] tells
+            whether the distinct and duplicate counts were estimated.
+    """
+    if context is None:
+        context = AnalysisContext(df)
+    elif context.df is not df:
+        raise ValueError("An analysis context can only be used with the DataFrame it was built for.")
+
+    n_rows = len(df)
+    missing_cells = context.null_counts().to_numpy()
+    if distinct_error is None:
+        distinct_values = np.array([context.distinct_count(column) for column in df.columns], dtype=np.int64)
+    else:
+        # The estimate can overshoot on nearly unique columns, there are no more distinct values than values
+        distinct_values = np.array([
+            HyperLogLog(distinct_error).update(df[column]).count() for column in df.columns
+        ], dtype=np.int64)
+        distinct_values = np.minimum(distinct_values, n_rows - missing_cells)
+    duplicate_values = n_rows - distinct_values - np.array([context.null_kinds(column) for column in df.columns], dtype=np.int64)
+
+    shares = 100 / n_rows if n_rows else 0.0
+    statistics = pd.DataFrame({
+        "Missing Cells": missing_cells,
+        "Missing Cells (%)": missing_cells * shares,
+        "Duplicate Values": duplicate_values,
+        "Duplicate Values (%)": duplicate_values * shares,
+        "Distinct Values": distinct_values,
+        "Distinct Values (%)": distinct_values * shares,
+        "Memory Size": df.memory_usage(deep=True, index=False).to_numpy(),
+    }, index=pd.Index(df.columns, name="Column Name"))
+    statistics.attrs["distinct_approximate"] = distinct_error is not None
+    return statistics
 
 # Function to generate the combined report
-def generate_combined_report(df, detailed_report_content, quality_summary_content, output_path="combined_report.html"):
+def generate_combined_report(df, detailed_report_content, quality_summary_content, output_path="combined_report.html",
+                             distinct_error=None, context=None):
     try:
-        # Add serial numbers (S.No) to the DataFrame
+        # Add serial numbers (S.No) to the DataFrame, the context computes the new column on demand
         df.insert(0, 'S.No', range(1, len(df) + 1))
 
         # Generate statistics
-        column_statistics = generate_statistics(df)
+        column_statistics = generate_statistics(df, distinct_error, context)
 
         # Generate HTML for the first and last 10 rows of the dataset
         first_10_rows_html = df.head(10).to_html(index=False)
@@ -57,7 +85,7 @@ def generate_combined_report(df, detailed_report_content, quality_summary_conten
 
         # Correlation visualization
         correlation_visualization_html = ""
-        numeric_columns = df.select_dtypes(include=['int64', 'float64'])
+        numeric_columns = df.select_dtypes(include=[np.number])  # Any width, loaded numbers are downcast
 
         if numeric_columns.shape[1] > 1:
             # Compute correlation matrix
@@ -123,22 +151,23 @@ def generate_combined_report(df, detailed_report_content, quality_summary_conten
         <select id='column-select' onchange='filterColumnStats(this.value)'>
             <option value='all' selected>All Columns</option>
         """
-        for stats in column_statistics:
-            dropdown_html += f"<option value='{stats['Column Name']}'>{stats['Column Name']}</option>"
+        for column in column_statistics.index:
+            dropdown_html += f"<option value='{column}'>{column}</option>"
         dropdown_html += "</select>"
 
         # Generate HTML for column statistics
         column_html = ""
-        for stats in column_statistics:
+        approximate_marker = "&asymp; " if column_statistics.attrs["distinct_approximate"] else ""
+        for column, stats in column_statistics.to_dict("index").items():
             column_html += f"""
-            <div class='column-container' data-column='{stats["Column Name"]}'>
-                <h3>{stats["Column Name"]}</h3>
+            <div class='column-container' data-column='{column}'>
+                <h3>{column}</h3>
                 <table class="stats-table">
                     <tr><th>Metric</th><th>Value</th></tr>
-                    <tr><td>Missing Cells</td><td>{stats['Missing Cells']} ({stats['Missing Cells (%)']})</td></tr>
-                    <tr><td>Duplicate Values</td><td>{stats['Duplicate Values']} ({stats['Duplicate Values (%)']})</td></tr>
-                    <tr><td>Distinct Values</td><td>{stats['Distinct Values']} ({stats['Distinct Values (%)']})</td></tr>
-                    <tr><td>Memory Size</td><td>{stats['Memory Size']}</td></tr>
+                    <tr><td>Missing Cells</td><td>{stats['Missing Cells']} ({stats['Missing Cells (%)']:.2f}%)</td></tr>
+                    <tr><td>Duplicate Values</td><td>{approximate_marker}{stats['Duplicate Values']} ({stats['Duplicate Values (%)']:.2f}%)</td></tr>
+                    <tr><td>Distinct Values</td><td>{approximate_marker}{stats['Distinct Values']} ({stats['Distinct Values (%)']:.2f}%)</td></tr>
+                    <tr><td>Memory Size</td><td>{format_memory_size(stats['Memory Size'])}</td></tr>
                 </table>
             </div>
             """
@@ -171,7 +200,7 @@ def generate_combined_report(df, detailed_report_content, quality_summary_conten
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Data Quality Report</title>
-    <link rel="stylesheet" href="Data_Validation\\dataProfrep\\Dpr.css">
+    <link rel="stylesheet" href="/static/Data_Validation/dataProfrep/Dpr.css">
     <script>
         function filterColumnStats(selectedValue) {{
             const allContainers = document.querySelectorAll('.column-container');
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+
+# Size in inches and resolution of every per-column chart
+CHART_SIZE = (18, 12)
+CHART_DPI = 100
+
+# Bound on the number of columns whose rendered charts are kept by default, about 100 KiB each
+DEFAULT_MAX_CHARTS = 1_000
+
+def chart_key(column, metrics, values):
+    """Hash of everything a column's charts show: its name, the metrics and their exact scores."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((str(column), tuple(metrics), tuple(float(value) for value in values))).encode("utf-8"))
+    return digest.hexdigest()
+
+def _encode_png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png", dpi=CHART_DPI)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+def render_column_charts(column, metrics, values):
+    """
+    Render the bar chart and heatmap of one column's scores as base64-encoded PNGs.
+
+    Figures are built with the object-oriented API rather than pyplot, so no global state is
+    touched and columns can be rendered in any process or thread.
+    """
+    bar_figure = Figure(figsize=CHART_SIZE)
+    ax = bar_figure.add_subplot()
+    ax.bar(metrics, values, color='#3498db')
+    ax.set_title(f"{column}")
+    ax.tick_params(axis="x", labelrotation=45)
+    bar_figure.tight_layout(rect=[0, 0, 1, 0.96])
+
+    heatmap_figure = Figure(figsize=CHART_SIZE)
+    ax = heatmap_figure.add_subplot()
+    sns.heatmap(np.array(values).reshape(1, -1), annot=True, fmt=".2f", cmap="coolwarm", cbar=False,
+                xticklabels=metrics, yticklabels=[column], ax=ax)
+    ax.set_title(f"{column}")
+    heatmap_figure.tight_layout(rect=[0, 0, 1, 0.96])
+
+    return {'bar_chart': _encode_png(bar_figure), 'heatmap': _encode_png(heatmap_figure)}
+
+class ChartCache:
+    """
+    Bounded LRU memo of rendered column charts, safe to share between threads.
+
+    Entries are keyed by the chart_key of the plotted values, so a report whose scores did not
+    change for a column reuses its images instead of rendering them again.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_CHARTS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the memoized charts for key, or None on a miss."""
+        with self._lock:
+            charts = self._entries.get(key)
+            if charts is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(charts)
+
+    def put(self, key, charts):
+        with self._lock:
+            self._entries[key] = dict(charts)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+def render_charts(detailed_scores_df, metrics, n_jobs=None, chart_cache=None):
+    """
+    Render the charts of every column of the scores, reusing cached ones.
+
+    Args:
+        detailed_scores_df (pd.DataFrame): Scores indexed by column name.
+        metrics (list): Metrics plotted, missing scores are plotted as 0.
+        n_jobs (int, optional): Number of worker processes rendering columns in parallel, all CPUs
+            with -1, serially when None. The workers are started for each call, so this only pays
+            off for many columns on an otherwise idle machine.
+        chart_cache (ChartCache, optional): Memo of charts already rendered, looked up by chart_key.
+
+    Returns:
+        dict: Maps each column to its 'bar_chart' and 'heatmap' base64-encoded PNGs, in column order.
+    """
+    plotted = {
+        column: [scores.get(metric, 0) for metric in metrics] for column, scores in detailed_scores_df.iterrows()
+    }
+    keys = {column: chart_key(column, metrics, values) for column, values in plotted.items()}
+
+    charts_data = {}
+    for column in plotted:
+        charts_data[column] = chart_cache.get(keys[column]) if chart_cache is not None else None
+    missing = [column for column, charts in charts_data.items() if charts is None]
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs is not None and n_jobs > 1 and len(missing) > 1:
+        # Forked workers start without importing anything again, as for parallel scoring
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(min(n_jobs, len(missing)), mp_context=context) as pool:
+            rendered = pool.map(
+                render_column_charts, missing, [metrics] * len(missing), [plotted[column] for column in missing],
+                chunksize=max(1, len(missing) // (n_jobs * 4)),
+            )
+            rendered = list(rendered)
+    else:
+        rendered = [render_column_charts(column, metrics, plotted[column]) for column in missing]
+
+    for column, charts in zip(missing, rendered):
+        charts_data[column] = charts
+        if chart_cache is not None:
+            chart_cache.put(keys[column], charts)
+    return charts_data
@@ -1,9 +1,14 @@
 import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-import pandas as pd
 import io
 import base64
+import html
+
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+from Data_Validation.dataquame.duplicates import find_duplicates
+from Data_Validation.datadetairep.chart_rendering import render_charts
+
+# Row numbers listed per duplicate cluster before the rest are elided
+LISTED_CLUSTER_ROWS = 10
 
 # Function to dynamically represent memory usage
 def format_memory_size(bytes_size):
@@ -14,36 +19,78 @@ def format_memory_size(bytes_size):
         index += 1
     return f"{bytes_size:.2f} {units[index]}"
 
-def generate_detailed_report(df, detailed_scores_df, overall_score):
+def duplicate_clusters_table(df, clusters, columns):
+    """HTML table of duplicate clusters: their size, row numbers counted from 1 and the values of their first row."""
+    rows = ["<table>", "<tr><th>Rows</th><th>Row Numbers</th><th>Values</th></tr>"]
+    for cluster in clusters:
+        numbers = ", ".join(str(position + 1) for position in cluster[:LISTED_CLUSTER_ROWS])
+        if len(cluster) > LISTED_CLUSTER_ROWS:
+            numbers += ", &hellip;"
+        values = "; ".join(f"{column}: {df[column].iloc[cluster[0]]}" for column in columns)
+        rows.append(f"<tr><td>{len(cluster)}</td><td>{numbers}</td><td>{html.escape(values)}</td></tr>")
+    rows.append("</table>")
+    return "".join(rows)
+
+def generate_detailed_report(df, detailed_scores_df, overall_score, context=None, duplicates=None, n_jobs=None,
+                             chart_cache=None):
     try:
+        # Null masks, duplicates and dtype kinds come from the context shared with the metrics and the profiling report
+        if context is None:
+            context = AnalysisContext(df)
+        missing_data = context.null_counts()
+        missing_cells = missing_data.sum()
+        # Distinct values and duplicate rows are counted from hashes, distinct values estimated with a sketch like Uniqueness
+        distinct_error = detailed_scores_df.attrs.get("distinct_error")
+        estimated = "&asymp; " if distinct_error is not None else ""
+        unique_values = context.distinct_cells(distinct_error)
+        duplicate_rows = context.duplicated_row_count()
+
         # Step 1: Calculate Dataset Statistics and Variable Types
         dataset_statistics = {
             "Number of Rows": len(df),
             "Number of Columns": df.shape[1],
-            "Missing Cells": df.isnull().sum().sum(),
-            "Missing Cells (%)": f"{(df.isnull().sum().sum() / (len(df) * df.shape[1])) * 100:.2f}%",  # Missing cells percentage
-            "Unique Values": len(pd.unique(df.values.ravel())),  # Unique values in the dataset
-            "Unique Values (%)": f"{(len(pd.unique(df.values.ravel())) / (len(df) * df.shape[1])) * 100:.2f}%",  # Unique values percentage
-            "Duplicate Rows": df.duplicated().sum(),
-            "Duplicate Rows (%)": f"{(df.duplicated().sum() / len(df)) * 100:.2f}%",  # Duplicate rows percentage
+            "Missing Cells": missing_cells,
+            "Missing Cells (%)": f"{(missing_cells / (len(df) * df.shape[1])) * 100:.2f}%",  # Missing cells percentage
+            "Unique Values": f"{estimated}{unique_values}",  # Unique values in the dataset
+            "Unique Values (%)": f"{estimated}{(unique_values / (len(df) * df.shape[1])) * 100:.2f}%",  # Unique values percentage
+            "Duplicate Rows": duplicate_rows,
+            "Duplicate Rows (%)": f"{(duplicate_rows / len(df)) * 100:.2f}%",  # Duplicate rows percentage
             "Total Memory Usage": format_memory_size(df.memory_usage(deep=True).sum())  # Memory usage
         }
 
+        # Dtypes are matched by kind, loaded datasets use compact types such as int8, float32 or Arrow strings
+        kinds = context.dtype_kinds()
         variable_types = {
-            "Text": sum(df.dtypes == 'object'),
-            "Categorical": sum(df.dtypes == 'category'),
-            "Numeric": sum(df.dtypes == 'int64') + sum(df.dtypes == 'float64'),
-            "Boolean": sum(df.dtypes == 'bool'),
-            "Datetime": sum(df.dtypes == 'datetime64[ns]')
+            "Text": kinds["text"],
+            "Categorical": kinds["categorical"],
+            "Numeric": kinds["numeric"],
+            "Boolean": kinds["boolean"],
+            "Datetime": kinds["datetime"]
         }
 
-        metrics = ['Completeness', 'Timeliness', 'Validity', 'Accuracy', 'Uniqueness', 'Consistency']
+        metrics = ['Completeness', 'Timeliness', 'Validity', 'Accuracy', 'Uniqueness', 'Consistency', 'Reliability']
+
+        # Metrics estimated from sketches or samples are marked as approximate
+        approximate_metrics = detailed_scores_df.attrs.get("approximate", [])
+        quantile_rank_error = detailed_scores_df.attrs.get("quantile_rank_error")
+        confidence_intervals = detailed_scores_df.attrs.get("confidence_intervals", {})
+        sample = detailed_scores_df.attrs.get("sample")
+        join = detailed_scores_df.attrs.get("join")
+
+        def approximate_marker(metric):
+            return "&asymp; " if metric in approximate_metrics else ""
+
+        def score_cell(col, metric, score):
+            # Scores estimated from a sample show their confidence interval below them
+            interval = confidence_intervals.get(col, {}).get(metric)
+            interval_note = f"<br><small>{interval[0]:.2f}&ndash;{interval[1]:.2f}%</small>" if interval else ""
+            return f"<td>{approximate_marker(metric)}{score:.2f}%{interval_note}</td>"
 
         # Step 3: Initialize HTML Content
         html_content = []
 
         # Add external CSS file
-        html_content.append("""<link rel="stylesheet" type="text/css" href="Data_Validation\\datadetairep\\Gde.css">""")
+        html_content.append("""<link rel="stylesheet" type="text/css" href="/static/Data_Validation/datadetairep/Gde.css">""")
 
         # Add navigation bar (Updated order)
         html_content.append("""<div class="navigation-bar"><ul>
@@ -51,6 +98,7 @@ def generate_detailed_report(df, detailed_scores_df, overall_score):
             <li><a href="#detailed-scores">Column-Wise Quality Scores</a></li>
             <li><a href="#average-scores">Average Quality Scores</a></li>
             <li><a href="#missing-values">Missing Values Analysis</a></li>
+            <li><a href="#duplicates">Duplicate Rows</a></li>
             <li><a href="#visualizations">Visualizations</a></li>
         </ul></div>""")
         
@@ -94,8 +142,20 @@ def generate_detailed_report(df, detailed_scores_df, overall_score):
         html_content.append("<table>")
         html_content.append("<tr><th>Column</th>" + "".join(f"<th>{metric}</th>" for metric in metrics) + "</tr>")
         for col, scores in detailed_scores_df.iterrows():
-            html_content.append("<tr>" + f"<td>{col}</td>" + "".join(f"<td>{scores.get(metric, 0):.2f}%</td>" for metric in metrics) + "</tr>")
-        html_content.append("</table></div>")
+            html_content.append("<tr>" + f"<td>{col}</td>" + "".join(score_cell(col, metric, scores.get(metric, 0)) for metric in metrics) + "</tr>")
+        html_content.append("</table>")
+        if join:
+            html_content.append(f"<p class='section-description'>Accuracy and Consistency compare rows with the same {', '.join(join['keys'])} ({join['method']} join): {join['matched']:,} rows matched, {join['left_only']:,} are only in this dataset and {join['right_only']:,} only in the reference.</p>")
+        if sample:
+            strata_note = f", drawn within each of the {sample['strata']} values of '{sample['stratify_by']}'" if sample["method"] == "stratified" else ""
+            html_content.append(f"<p class='section-description'>&asymp; marks scores estimated from a {sample['method']} sample of {sample['rows']:,} of {sample['total_rows']:,} rows{strata_note}. The ranges below them are {sample['confidence']:.0%} confidence intervals.</p>")
+        if "Uniqueness" in approximate_metrics:
+            error_note = f" with a relative error of about {distinct_error * 100:g}%" if distinct_error else ""
+            html_content.append(f"<p class='section-description'>&asymp; marks estimated scores (Uniqueness), computed from a sketch{error_note}.</p>")
+        if "Reliability" in approximate_metrics:
+            error_note = f", which places values to within about {quantile_rank_error * 100:.1f}% of their rank" if quantile_rank_error else ""
+            html_content.append(f"<p class='section-description'>&asymp; marks estimated scores (Reliability), whose outlier fences come from a quantile sketch{error_note}.</p>")
+        html_content.append("</div>")
 
         # Step 5: Overall Average Quality Scores Section
         html_content.append("<div id='average-scores'><h3 class='section-title'>Overall Average Quality Scores</h3>")
@@ -103,12 +163,11 @@ def generate_detailed_report(df, detailed_scores_df, overall_score):
         html_content.append("<tr><th>Metric</th><th>Average Score (%)</th></tr>")
         for metric in metrics:
             overall_metric_score = detailed_scores_df[metric].mean()
-            html_content.append(f"<tr><td>{metric}</td><td>{overall_metric_score:.2f}%</td></tr>")
+            html_content.append(f"<tr><td>{metric}</td><td>{approximate_marker(metric)}{overall_metric_score:.2f}%</td></tr>")
         html_content.append("</table></div>")
 
         # Step 6: Move Missing Values Analysis Section here (after Average Scores)
-        missing_data = df.isnull().sum()
-        present_data = df.notnull().sum()
+        present_data = len(df) - missing_data
         features = df.columns
 
         plt.figure(figsize=(14, 10))  
@@ -167,46 +226,30 @@ def generate_detailed_report(df, detailed_scores_df, overall_score):
             </div>
         </div>""")
 
+        # Step 7: Clusters of exact and near-duplicate rows, only exact ones unless find_duplicates was given columns
+        if duplicates is None:
+            duplicates = find_duplicates(df, context=context)
+        exact = duplicates["exact"]
+        html_content.append("<div id='duplicates'><h3 class='section-title'>Duplicate Rows</h3>")
+        html_content.append(f"<p class='section-description'>Groups of identical rows: {exact['clusters']:,}, covering {exact['rows']:,} rows.</p>")
+        if exact["largest"]:
+            html_content.append(duplicate_clusters_table(df, exact["largest"], df.columns))
+        near = duplicates.get("near")
+        if near:
+            html_content.append(f"<p class='section-description'>Groups of near-duplicate rows, whose {', '.join(near['columns'])} are about {near['threshold']:.0%} alike or more: {near['clusters']:,}, covering {near['rows']:,} rows.</p>")
+            if near["largest"]:
+                html_content.append(duplicate_clusters_table(df, near["largest"], near["columns"]))
+        html_content.append("</div>")
+
         html_content.append("""<div id="visualizations">
             <h3 class='section-title'>Select a Column to View Visualizations</h3>
             <select id="column-select" onchange="showChart(this.value)">
                 <option value="">Select a Column</option>""")
  
-        charts_data = {}
-        for col, scores in detailed_scores_df.iterrows():
+        # Charts are rendered in a separate stage, on a process pool and from the cache when given
+        charts_data = render_charts(detailed_scores_df, metrics, n_jobs=n_jobs, chart_cache=chart_cache)
+        for col in charts_data:
             html_content.append(f"<option value='{col}'>{col}</option>")
-            values = [scores.get(metric, 0) for metric in metrics]
- 
-            # Generate Bar Chart
-            plt.figure(figsize=(18, 12))  
-
-            plt.bar(metrics, values, color='#3498db')
-            plt.title(f"{col}")
-            plt.xticks(rotation=45)
-            plt.tight_layout(rect=[0, 0, 1, 0.96]) 
-
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100)
-            buffer.seek(0)
-            bar_chart = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            buffer.close()
-            plt.close()
- 
-           
-            plt.figure(figsize=(18, 12))  
-
-            sns.heatmap(np.array(values).reshape(1, -1), annot=True, fmt=".2f", cmap="coolwarm", cbar=False, xticklabels=metrics, yticklabels=[col])
-            plt.title(f"{col}")
-            plt.tight_layout(rect=[0, 0, 1, 0.96])  
-
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=100)
-            buffer.seek(0)
-            heatmap = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            buffer.close()
-            plt.close()
- 
-            charts_data[col] = {'bar_chart': bar_chart, 'heatmap': heatmap}
  
         html_content.append("</select></div>")
  
@@ -0,0 +1,108 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_ds
+    import pyarrow.parquet as pq
+    from pyarrow import feather
+except ImportError:  # pyarrow is optional, only CSV files can be loaded without it
+    pa = None
+    pa_ds = None
+    pq = None
+    feather = None
+
+# Leading bytes identifying the binary formats load_dataset reads besides CSV
+FORMAT_MAGIC = [
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "ipc"),  # Arrow IPC file, which Feather V2 is
+    (b"FEA1", "feather_v1"),
+    (b"\xff\xff\xff\xff", "ipc_stream"),
+]
+MAGIC_BYTES = max(len(magic) for magic, _ in FORMAT_MAGIC)
+
+# Comparison operators of row filters, as in pyarrow.parquet filters
+_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+def detect_format(head):
+    """Return the format of a file from its first bytes: 'parquet', 'ipc', 'feather_v1', 'ipc_stream' or 'csv'."""
+    for magic, file_format in FORMAT_MAGIC:
+        if head.startswith(magic):
+            return file_format
+    return "csv"
+
+def open_columnar(path, file_format):
+    """Open a Parquet, Feather or Arrow IPC file as a pyarrow Dataset."""
+    if pa_ds is None:
+        raise ValueError(f"Reading {file_format} files requires pyarrow to be installed.")
+    if file_format == "parquet":
+        return pa_ds.dataset(path, format="parquet")
+    if file_format == "ipc":
+        return pa_ds.dataset(path, format="ipc")
+    # Feather V1 files and Arrow IPC streams have no random access, they are scanned in memory
+    if file_format == "feather_v1":
+        return pa_ds.dataset(feather.read_table(path))
+    with pa.ipc.open_stream(path) as reader:
+        return pa_ds.dataset(reader.read_all())
+
+def scan_columnar(path, file_format, columns=None, filters=None, batch_size=None):
+    """
+    Scan only the requested columns and rows of a columnar file.
+
+    Filters use the pyarrow.parquet syntax, a list of (column, op, value) tuples that must all
+    hold, or a list of such lists of which one must hold. For Parquet, row groups whose
+    statistics rule them out are never decoded.
+    """
+    dataset = open_columnar(path, file_format)
+    if columns is not None:
+        missing = [column for column in columns if column not in dataset.schema.names]
+        if missing:
+            raise ValueError(f"Columns not found in the dataset: {', '.join(map(str, missing))}")
+
+    options = {"columns": columns, "filter": pq.filters_to_expression(filters) if filters else None}
+    if batch_size is not None:
+        options["batch_size"] = batch_size
+    return dataset.scanner(**options)
+
+def table_to_frame(table):
+    """Convert an Arrow table to pandas, keeping text as Arrow-backed strings as load_dataset does for CSV."""
+    string_type = pd.StringDtype("pyarrow")
+    df = table.to_pandas(types_mapper={pa.string(): string_type, pa.large_string(): string_type}.get)
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+def read_columnar(path, file_format, columns=None, filters=None):
+    return table_to_frame(scan_columnar(path, file_format, columns, filters).to_table())
+
+def filter_mask(df, filters):
+    """
+    Evaluate row filters in the syntax of scan_columnar on a DataFrame.
+    As in Arrow, rows where the filtered column is missing never match.
+    """
+    groups = filters if isinstance(filters[0], list) else [filters]
+    mask = np.zeros(len(df), dtype=bool)
+    for group in groups:
+        group_mask = np.ones(len(df), dtype=bool)
+        for column, op, value in group:
+            values = df[column]
+            if op == "in":
+                matches = values.isin(value)
+            elif op == "not in":
+                matches = ~values.isin(value)
+            elif op in _OPERATORS:
+                matches = _OPERATORS[op](values, value)
+            else:
+                raise ValueError(f"Unsupported filter operator '{op}'.")
+            group_mask &= matches.fillna(False).to_numpy(dtype=bool) & values.notna().to_numpy()
+        mask |= group_mask
+    return mask
@@ -0,0 +1,63 @@
+import bz2
+import gzip
+import lzma
+import shutil
+import tempfile
+import zipfile
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+# Leading bytes of the compressed formats load_dataset decompresses on the fly
+COMPRESSION_MAGIC = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"PK\x03\x04", "zip"),
+]
+
+def detect_compression(head):
+    """Return the compression of a file from its first bytes, or None if it is not compressed."""
+    for magic, compression in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return compression
+    return None
+
+def _zip_member(archive):
+    """The one data file of a zip archive, ignoring folders and macOS metadata."""
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+    ]
+    if len(members) != 1:
+        names = ", ".join(info.filename for info in members) or "none"
+        raise ValueError(f"Zip archives must contain exactly one dataset, found: {names}")
+    return archive.open(members[0])
+
+def open_decompressed(stream, compression):
+    """
+    Wrap a binary stream in a decompressing reader, so it is decompressed while it is read and
+    never written out uncompressed. Zip archives need random access, so a stream that cannot seek
+    is first spooled, still compressed, to a temporary file.
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(stream, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(stream, mode="rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading zstd-compressed files requires the zstandard package.")
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    if compression == "zip":
+        if not stream.seekable():
+            spool = tempfile.TemporaryFile()
+            shutil.copyfileobj(stream, spool)
+            spool.seek(0)
+            stream = spool
+        return _zip_member(zipfile.ZipFile(stream))
+    raise ValueError(f"Unsupported compression '{compression}'.")
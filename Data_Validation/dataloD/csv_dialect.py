@@ -0,0 +1,72 @@
+import codecs
+import csv
+
+# Bytes of the file the dialect is sniffed from
+SNIFF_BYTES = 16 * 1024
+
+# Delimiters the sniffer chooses from
+CANDIDATE_DELIMITERS = ",\t;|"
+
+# Encodings tried in order, latin-1 decodes any byte sequence and always succeeds
+CANDIDATE_ENCODINGS = ["utf-8", "cp1252", "latin-1"]
+
+def detect_encoding(head):
+    """Return the first candidate encoding the head of a file decodes with."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            # Incremental decoding tolerates a character cut at the end of the head
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CANDIDATE_ENCODINGS[-1]
+
+def _looks_like_data(row):
+    """Header rows hold names, so a first row with a number in it is taken as data."""
+    for field in row:
+        try:
+            float(field)
+            return True
+        except ValueError:
+            continue
+    return False
+
+def sniff_csv(head):
+    """
+    Detect the encoding, delimiter, quote character and header of a CSV file from its first bytes.
+
+    Returns the matching read_csv options. Files are assumed to have a header unless the csv
+    sniffer finds none and the first row contains numbers, since unnamed columns are rarely
+    what was meant.
+    """
+    head = head[:SNIFF_BYTES]
+    encoding = detect_encoding(head)
+    text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head, final=False)
+    if len(head) == SNIFF_BYTES and "\n" in text:
+        text = text[:text.rfind("\n")]  # The last line may be cut off
+
+    options = {"sep": ",", "quotechar": '"', "encoding": encoding}
+    if not text.strip():
+        return options
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=CANDIDATE_DELIMITERS)
+    except csv.Error:
+        return options  # A single column, or no consistent delimiter, is read as comma separated
+    options["sep"] = dialect.delimiter
+    options["quotechar"] = dialect.quotechar or '"'
+    if dialect.escapechar:
+        options["escapechar"] = dialect.escapechar
+    if dialect.skipinitialspace:
+        options["skipinitialspace"] = True
+
+    try:
+        has_header = csv.Sniffer().has_header(text)
+    except csv.Error:
+        has_header = True
+    first_row = next(csv.reader(text.splitlines()[:1], dialect), [])
+    if not has_header and _looks_like_data(first_row):
+        options["header"] = None
+        options["names"] = [f"column_{i + 1}" for i in range(len(first_row))]
+    return options
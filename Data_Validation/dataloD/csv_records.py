@@ -0,0 +1,85 @@
+import numpy as np
+
+# Bytes of CSV text read at a time when a file is streamed with the C parser
+DEFAULT_BLOCK_BYTES = 4 * 1024 * 1024
+
+def split_records(data, csv_options):
+    """
+    Find the records of CSV bytes that start at a record boundary, and count their fields.
+
+    A line break ends a record unless it is inside a quoted field, which is the case when an odd
+    number of quote characters precede it, escaped ones aside. Fields are counted from the
+    delimiters outside quoted fields. Blank lines, which the C parser skips, have no fields.
+    Bytes after the last line break ending a record are left out.
+
+    Returns:
+        tuple: Arrays of the offsets the records start and end at, line breaks included, and of
+            their number of fields.
+    """
+    sep = csv_options.get("sep", ",")
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    quotes = buffer == ord(csv_options.get("quotechar", '"'))
+    delimiters = buffer == ord(sep)
+    escapechar = csv_options.get("escapechar")
+    if escapechar:
+        escaped = np.zeros(len(buffer), dtype=bool)
+        escaped[1:] = buffer[:-1] == ord(escapechar)
+        quotes &= ~escaped
+        delimiters &= ~escaped
+    # Quotes are few next to the other bytes, positions are classified by the quotes before them
+    quote_offsets = np.flatnonzero(quotes)
+    line_breaks = np.flatnonzero(buffer == ord("\n"))
+    if len(quote_offsets):
+        line_breaks = line_breaks[np.searchsorted(quote_offsets, line_breaks) % 2 == 0]
+
+    ends = line_breaks + 1
+    starts = np.concatenate([[0], ends[:-1]]).astype(ends.dtype)
+    delimiter_offsets = np.flatnonzero(delimiters)
+    fields = np.searchsorted(delimiter_offsets, ends) - np.searchsorted(delimiter_offsets, starts) + 1
+    if len(quote_offsets) > 1:
+        # Delimiters between each opening quote and its closing one are not counted in their record
+        closing = quote_offsets[1::2]
+        opening = quote_offsets[0::2][:len(closing)]
+        quoted = np.searchsorted(delimiter_offsets, closing) - np.searchsorted(delimiter_offsets, opening)
+        records = np.searchsorted(ends, opening, side="right")
+        within = records < len(ends)
+        fields -= np.bincount(records[within], weights=quoted[within], minlength=len(ends)).astype(fields.dtype)
+
+    # A line of nothing but whitespace is blank, unless the whitespace is the delimiter. Lines with
+    # a delimiter are not, the others are checked.
+    if len(ends) and (fields == 1).any():
+        blank_bytes = np.frombuffer(" \t\r\n".replace(sep, "").encode(), dtype=np.uint8)
+        content = np.add.reduceat(~np.isin(buffer[:ends[-1]], blank_bytes), starts, dtype=np.int32)
+        fields[(fields == 1) & (content == 0)] = 0
+    return starts, ends, fields
+
+def record_blocks(stream, csv_options, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Read a CSV byte stream in blocks of about block_bytes that end at record boundaries.
+
+    Yields each block with its records as split_records returns them. A record longer than
+    block_bytes is read on until it ends, and a last line without a line break is given one.
+    """
+    pending = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        data = pending + data
+        starts, ends, fields = split_records(data, csv_options)
+        if len(ends) == 0:
+            pending = data
+            continue
+        pending = data[ends[-1]:]
+        yield data[:ends[-1]], starts, ends, fields
+    if pending:
+        data = pending + b"\n"
+        yield (data, *split_records(data, csv_options))
+
+def join_records(data, starts, ends, keep):
+    """Bytes of the kept records of data, runs of consecutive kept records copied in one slice."""
+    edges = np.diff(np.concatenate([[0], keep.astype(np.int8), [0]]))
+    return b"".join(
+        data[starts[first]:ends[last - 1]]
+        for first, last in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+    )
@@ -1,10 +1,441 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
 import pandas as pd
 
+from Data_Validation.dataloD.columnar import (
+    MAGIC_BYTES, detect_format, filter_mask, read_columnar, scan_columnar, table_to_frame
+)
+from Data_Validation.dataloD.compression import detect_compression, open_decompressed
+from Data_Validation.dataloD.csv_dialect import SNIFF_BYTES, sniff_csv
+from Data_Validation.dataloD.csv_records import join_records, record_blocks, split_records
+from Data_Validation.dataloD.dtype_inference import (
+    DEFAULT_SAMPLE_ROWS, apply_read_options, downcast_numeric, infer_read_options
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional, streaming falls back to the C parser
+    pa = None
+    pa_compute = None
+    pa_csv = None
+
+# Default number of rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 100_000
+
+class _ReplayStream(io.RawIOBase):
+    """Binary stream yielding already consumed head bytes before the rest of the underlying stream."""
+
+    def __init__(self, head, stream):
+        self._head = head
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._head:
+            size = min(len(buffer), len(self._head))
+            buffer[:size] = self._head[:size]
+            self._head = self._head[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _header_record(starts, fields, csv_options):
+    """
+    Position of the header among the records of a CSV file's first block, -1 when the names are
+    given, and the number of fields rows should have. None when the block is blank.
+    """
+    if "names" in csv_options:
+        return -1, len(csv_options["names"])
+    nonblank = np.flatnonzero(fields)
+    if len(nonblank) == 0:
+        return None
+    return nonblank[0], fields[nonblank[0]]
+
+def _drop_long_rows(data, csv_options):
+    """
+    Drop the rows with more fields than the header from the start of a CSV file, bytes after
+    its last complete record are kept as they are. The C parser only skips such rows after the
+    first one, whose extra fields it drops instead.
+    """
+    starts, ends, fields = split_records(data, csv_options)
+    header = _header_record(starts, fields, csv_options)
+    if header is None:
+        return data
+    keep = np.ones(len(starts), dtype=bool)
+    keep[header[0] + 1:] = fields[header[0] + 1:] <= header[1]
+    return join_records(data, starts, ends, keep) + data[ends[-1]:]
+
+def _read_csv(source, infer_dtypes, sample_rows, columns=None, filters=None, parse_dates=False):
+    # Column names are matched once stripped, as they are returned. Filtered columns are read too,
+    # the rows are filtered before the columns are projected.
+    usecols = None
+    if columns is not None:
+        wanted = set(columns) | set(_filter_columns(filters))
+        usecols = lambda name: name.strip() in wanted
+
+    # Sniff the dialect and infer the schema from the first rows, then replay them into the full read,
+    # so sources that can only be read once, such as uploads still being received, work as well as files.
+    # The C parser infers each column's type over the whole file, as the python parser did.
+    head = b"".join(line for _, line in zip(range(sample_rows + 1), source))
+    csv_options = {**sniff_csv(head), "engine": "c", "low_memory": False, "on_bad_lines": "skip", "usecols": usecols}
+    head = _drop_long_rows(head, csv_options)
+    read_options = {}
+    if infer_dtypes:
+        read_options = infer_read_options(pd.read_csv(io.BytesIO(head), **csv_options), parse_dates)
+    df = pd.read_csv(io.BufferedReader(_ReplayStream(head, source)), **csv_options, **read_options)
+    return downcast_numeric(df) if infer_dtypes else df
+
+def _convert_text_columns(table):
+    """
+    Convert the text columns of an Arrow table to integers, floats or booleans when all their values
+    parse as such, as the C parser does for each chunk. Dates and other text are left as text.
+    """
+    for position, field in enumerate(table.schema):
+        if not pa.types.is_string(field.type):
+            continue
+        for target in (pa.int64(), pa.float64(), pa.bool_()):
+            try:
+                converted = pa_compute.cast(table.column(position), target)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                continue
+            table = table.set_column(position, field.name, converted)
+            break
+    return table
+
+def _is_path(path):
+    return isinstance(path, (str, bytes)) or hasattr(path, "__fspath__")
+
+def _peekable(stream):
+    return stream if hasattr(stream, "peek") else io.BufferedReader(_ReplayStream(b"", stream))
+
+@contextlib.contextmanager
+def _open_dataset(path):
+    """
+    Open a path or binary stream for reading, decompressing it on the fly when its first bytes
+    show gzip, bz2, xz, zstd or zip compression. Yields the stream and the compression found.
+    """
+    with contextlib.ExitStack() as stack:
+        stream = stack.enter_context(open(path, "rb")) if _is_path(path) else _peekable(path)
+        compression = detect_compression(stream.peek(MAGIC_BYTES)[:MAGIC_BYTES])
+        if compression is not None:
+            stream = _peekable(stack.enter_context(open_decompressed(stream, compression)))
+        yield stream, compression
+
+@contextlib.contextmanager
+def _columnar_path(path, stream, compression):
+    """
+    Yield a path pyarrow can read a columnar file from. Columnar formats need random access, so
+    streams and compressed files are spooled, decompressed, to a temporary file first.
+    """
+    if compression is None and _is_path(path):
+        yield path
+        return
+    with tempfile.TemporaryDirectory(prefix="dq_load_") as spool_dir:
+        spool_path = os.path.join(spool_dir, "dataset")
+        with open(spool_path, "wb") as spool:
+            shutil.copyfileobj(stream, spool)
+        yield spool_path
+
+def _filter_columns(filters):
+    """Columns the filters test, in the syntax of scan_columnar."""
+    if not filters:
+        return []
+    groups = filters if isinstance(filters[0], list) else [filters]
+    return [column for group in groups for column, _, _ in group]
+
+def _select(df, columns=None, filters=None):
+    """
+    Keep the rows matching the filters, then the requested columns in the requested order.
+    Filters may test columns that are not kept.
+    """
+    wanted = list(columns or []) + _filter_columns(filters)
+    missing = [column for column in dict.fromkeys(wanted) if column not in df.columns]
+    if missing:
+        raise ValueError(f"Columns not found in the dataset: {', '.join(map(str, missing))}")
+    if filters:
+        df = df[filter_mask(df, filters)]
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
 # Load dataset
-def load_dataset(path):
+def load_dataset(path, chunksize=None, engine=None, infer_dtypes=True, sample_rows=DEFAULT_SAMPLE_ROWS,
+                 columns=None, filters=None, parse_dates=False):
+    """
+    Loads a CSV, Parquet, Feather or Arrow IPC dataset into a DataFrame.
+
+    The format is detected from the first bytes of the file. Parquet, Feather and Arrow IPC
+    files keep their own types and require pyarrow. Files compressed with gzip, bz2, xz, zstd
+    (with the zstandard package) or zip, holding a single dataset, are decompressed while read.
+
+    Args:
+        path (str or file-like): Path to the file, or a binary stream of it.
+        chunksize (int, optional): When given, the file is streamed instead and a
+            DatasetChunks iterator yielding DataFrames of at most this many rows is returned.
+        engine (str, optional): CSV parser used in streaming mode ('pyarrow' or 'c').
+            Defaults to pyarrow when it is installed.
+        infer_dtypes (bool): Infer compact dtypes for CSV files from the first `sample_rows` rows and
+            use them for the full read: text becomes categorical or Arrow strings and numbers are
+            downcast. When False every text column is left as object.
+        sample_rows (int): Number of rows the dtypes are inferred from.
+        columns (list, optional): Only load these columns, in this order.
+        filters (list, optional): Only load rows matching these filters, in the pyarrow.parquet
+            syntax, e.g. [("country", "==", "DE"), ("amount", ">", 0)]. They are pushed down into
+            the reader for columnar files, so Parquet row groups ruled out by their statistics are
+            never decoded. Filtered rows are renumbered from 0.
+        parse_dates (bool): With infer_dtypes, also parse the CSV columns whose sample values are all
+            dates. Off by default: Timeliness is only assessed on datetime columns, so parsing them
+            changes the scores of a dataset.
+
+    Returns:
+        pd.DataFrame or DatasetChunks: The loaded dataset, or a chunk iterator in streaming mode.
+    """
+    if chunksize is not None:
+        return DatasetChunks(
+            path, chunksize=chunksize, engine=engine, infer_dtypes=infer_dtypes, sample_rows=sample_rows,
+            columns=columns, filters=filters, parse_dates=parse_dates,
+        )
     try:
-        df = pd.read_csv(path, engine="python", on_bad_lines="skip", encoding="utf-8")
+        with _open_dataset(path) as (stream, compression):
+            file_format = detect_format(stream.peek(MAGIC_BYTES)[:MAGIC_BYTES])
+            if file_format != "csv":
+                with _columnar_path(path, stream, compression) as columnar_path:
+                    return read_columnar(columnar_path, file_format, columns, filters)
+            df = _read_csv(stream, infer_dtypes, sample_rows, columns, filters, parse_dates)
         df.columns = df.columns.str.strip()  # Strip column names
+        df = _select(df, columns, filters)
+        if filters:
+            df = df.reset_index(drop=True)
         return df
     except Exception as e:
         raise ValueError(f"Error reading the file: {e}")
+
+class DatasetChunks:
+    """
+    Streams a dataset file as DataFrames of at most `chunksize` rows.
+
+    Files in any format and compression load_dataset reads are supported. The file is opened
+    several times, so it must be given as a path.
+
+    Malformed rows are handled as load_dataset does, whatever the engine and chunk size: rows with
+    more fields than the header are skipped and counted in `bad_lines`, rows with fewer are padded
+    with missing values. The count is complete once the iterator has been exhausted. With
+    infer_dtypes, the dtypes load_dataset would infer are applied to every chunk, numbers are not
+    downcast.
+    """
+
+    def __init__(self, path, chunksize=DEFAULT_CHUNKSIZE, engine=None, infer_dtypes=True, sample_rows=DEFAULT_SAMPLE_ROWS,
+                 columns=None, filters=None, parse_dates=False):
+        if chunksize is None or chunksize <= 0:
+            raise ValueError("chunksize must be a positive number of rows.")
+        if engine is None:
+            engine = "pyarrow" if pa_csv is not None else "c"
+        if engine not in ("pyarrow", "c"):
+            raise ValueError(f"Unsupported streaming engine '{engine}'. Use 'pyarrow' or 'c'.")
+        if engine == "pyarrow" and pa_csv is None:
+            raise ValueError("The 'pyarrow' engine requires pyarrow to be installed.")
+
+        self.path = path
+        self.chunksize = chunksize
+        self.engine = engine
+        self.infer_dtypes = infer_dtypes
+        self.sample_rows = sample_rows
+        self.columns = columns
+        self.filters = filters
+        self.parse_dates = parse_dates
+        self.csv_options = None
+        self.bad_lines = 0
+        self._short_row = False
+
+    def _infer_read_options(self):
+        with _open_dataset(self.path) as (stream, _):
+            sample = pd.read_csv(
+                stream, nrows=self.sample_rows, engine="c", index_col=False, on_bad_lines="skip", **self.csv_options
+            )
+        sample.columns = sample.columns.str.strip()
+        return infer_read_options(sample, self.parse_dates)
+
+    def __iter__(self):
+        self.bad_lines = 0
+        try:
+            with _open_dataset(self.path) as (stream, _):
+                head = stream.read(SNIFF_BYTES)
+            file_format = detect_format(head)
+            if file_format != "csv":
+                yield from self._iter_columnar(file_format)
+                return
+
+            self.csv_options = sniff_csv(head)
+            read_options = self._infer_read_options() if self.infer_dtypes else {}
+            # pyarrow cannot skip spaces after delimiters, such files are read with the C parser
+            if self.engine == "pyarrow" and not self.csv_options.get("skipinitialspace"):
+                chunks = self._iter_pyarrow()
+            else:
+                chunks = self._iter_c()
+            start = 0
+            for chunk in chunks:
+                chunk = _select(apply_read_options(chunk, read_options), self.columns, self.filters)
+                if self.filters:
+                    # Keep a running row index over the rows that passed the filters
+                    chunk.index = pd.RangeIndex(start, start + len(chunk))
+                    start += len(chunk)
+                    if chunk.empty:
+                        continue
+                yield chunk
+        except (OSError, KeyError, ValueError, pd.errors.ParserError) as e:
+            raise ValueError(f"Error reading the file: {e}")
+
+    def _iter_columnar(self, file_format):
+        # Columns and filters are pushed down into the reader, types come from the file
+        if pa is None:
+            raise ValueError(f"Reading {file_format} files requires pyarrow to be installed.")
+        with _open_dataset(self.path) as (stream, compression):
+            with _columnar_path(self.path, stream, compression) as columnar_path:
+                scanner = scan_columnar(columnar_path, file_format, self.columns, self.filters, self.chunksize)
+                yield from self._rebatch(scanner.to_batches())
+
+    def _skip_bad_line(self, row):
+        if row.actual_columns < row.expected_columns:
+            # pyarrow cannot pad short rows, stop reading and let the C parser take over
+            self._short_row = True
+            return "error"
+        self.bad_lines += 1
+        return "skip"
+
+    def _open_pyarrow_reader(self, stream, column_types=None):
+        encoding = self.csv_options["encoding"]
+        return pa_csv.open_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(
+                encoding="utf8" if encoding.startswith("utf-8") else encoding,  # A UTF-8 BOM is skipped anyway
+                column_names=self.csv_options.get("names"),
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=self.csv_options["sep"],
+                quote_char=self.csv_options["quotechar"],
+                escape_char=self.csv_options.get("escapechar", False),
+                invalid_row_handler=self._skip_bad_line,
+            ),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types or {}, strings_can_be_null=True),
+        )
+
+    def _iter_pyarrow(self):
+        # pyarrow fixes each column's type from the first block, and fails on a later value that does
+        # not convert. Every column is read as text instead, and converted chunk by chunk in _to_frame.
+        self._short_row = False
+        rows = 0
+        try:
+            with _open_dataset(self.path) as (stream, _):
+                names = self._open_pyarrow_reader(stream).schema.names
+
+            self.bad_lines = 0
+            with _open_dataset(self.path) as (stream, _):
+                reader = self._open_pyarrow_reader(stream, {name: pa.string() for name in names})
+                for chunk in self._rebatch(reader, from_csv=True):
+                    rows += len(chunk)
+                    yield chunk
+        except pa.ArrowInvalid:
+            if not self._short_row:
+                raise
+            # The C parser reads the same rows up to the short one, it counts bad lines from the start again
+            self.bad_lines = 0
+            yield from self._iter_c(skip_rows=rows)
+
+    def _rebatch(self, batches, from_csv=False):
+        """Regroup Arrow record batches into DataFrames of exactly `chunksize` rows, but the last."""
+        pending = []
+        pending_rows = 0
+        start = 0
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows < self.chunksize:
+                continue
+
+            table = pa.Table.from_batches(pending)
+            offset = 0
+            while table.num_rows - offset >= self.chunksize:
+                yield self._to_frame(table.slice(offset, self.chunksize), start, from_csv)
+                offset += self.chunksize
+                start += self.chunksize
+            remainder = table.slice(offset)
+            pending = remainder.to_batches()
+            pending_rows = remainder.num_rows
+
+        if pending_rows:
+            yield self._to_frame(pa.Table.from_batches(pending), start, from_csv)
+
+    def _iter_c(self, skip_rows=0):
+        """Stream the CSV with the C parser, leaving out the first skip_rows rows, a multiple of chunksize."""
+        # The chunked C reader keeps the first row of each chunk whatever its number of fields. The
+        # records are found and their fields counted beforehand instead: rows with extra fields are
+        # dropped and counted, and the rows of each chunk are parsed on their own.
+        header = None
+        pending = []
+        pending_rows = 0
+        start = 0
+        with _open_dataset(self.path) as (stream, _):
+            for block, starts, ends, fields in record_blocks(stream, self.csv_options):
+                if header is None:
+                    found = _header_record(starts, fields, self.csv_options)
+                    if found is None:
+                        continue
+                    position, field_count = found
+                    header = block[starts[position]:ends[position]] if position >= 0 else b""
+                    starts, ends, fields = starts[position + 1:], ends[position + 1:], fields[position + 1:]
+                    if len(starts) == 0:
+                        continue
+
+                long = fields > field_count
+                self.bad_lines += int(long.sum())
+                rows = np.cumsum((fields > 0) & ~long) + pending_rows
+                # Records completing a chunk, counting the rows pending from earlier blocks
+                cuts = np.searchsorted(rows, np.arange(self.chunksize, rows[-1] + 1, self.chunksize)) + 1
+                first = 0
+                for cut in cuts:
+                    pending.append(join_records(block, starts[first:cut], ends[first:cut], ~long[first:cut]))
+                    if start >= skip_rows:
+                        yield self._parse_c_chunk(header, pending, start)
+                    start += self.chunksize
+                    pending = []
+                    first = cut
+                pending.append(join_records(block, starts[first:], ends[first:], ~long[first:]))
+                pending_rows = int(rows[-1]) - len(cuts) * self.chunksize
+
+        if pending_rows and start >= skip_rows:
+            yield self._parse_c_chunk(header, pending, start)
+
+    def _parse_c_chunk(self, header, records, start):
+        # Rows the C parser still finds malformed are only reported through warnings
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", pd.errors.ParserWarning)
+            chunk = pd.read_csv(io.BytesIO(header + b"".join(records)), engine="c", on_bad_lines="warn", **self.csv_options)
+        self.bad_lines += sum(
+            str(w.message).count("Skipping line") for w in caught if issubclass(w.category, pd.errors.ParserWarning)
+        )
+        chunk.columns = chunk.columns.str.strip()
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        return chunk
+
+    @staticmethod
+    def _to_frame(table, start, from_csv):
+        # Keep a running row index across chunks, as the C parser does
+        if from_csv:
+            # CSV text is converted like the C parser does, to object columns
+            df = _convert_text_columns(table).to_pandas()
+            df.columns = df.columns.str.strip()
+        else:
+            df = table_to_frame(table)
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
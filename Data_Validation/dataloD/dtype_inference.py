@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:  # without pyarrow, text columns stay object, the python string dtype saves nothing
+    TEXT_DTYPE = None
+
+# Rows parsed to infer the schema before the full read
+DEFAULT_SAMPLE_ROWS = 10_000
+
+# Text columns whose sample has at most this share of distinct values become categorical
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+
+def _date_format(values):
+    """Return the strftime format every value parses with, or None if they are not all dates."""
+    date_format = guess_datetime_format(values.iloc[0])
+    if date_format is None:
+        return None
+    # Bare years or times are not dates, and timezones would make the column incomparable to naive dates
+    if not any(part in date_format for part in ("%m", "%b", "%B")) or "%z" in date_format or "%Z" in date_format:
+        return None
+    if pd.to_datetime(values, format=date_format, errors="coerce").isna().any():
+        return None
+    return date_format
+
+def infer_read_options(sample, parse_dates=False):
+    """
+    Infer compact dtypes for the text columns of a sample and return them as read_csv options.
+
+    Low-cardinality text becomes categorical and other text is stored as Arrow strings. With
+    parse_dates, columns of dates are parsed with the format found in the sample instead. Numeric columns are left to
+    the parser and downcast afterwards by downcast_numeric, since only the full column tells
+    which type its range fits in.
+    """
+    dtype = {}
+    date_columns = []
+    date_format = {}
+    for column in sample.columns:
+        values = sample[column].dropna()
+        if sample[column].dtype != object or values.empty:
+            continue
+
+        column_format = _date_format(values) if parse_dates else None
+        if column_format is not None:
+            date_columns.append(column)
+            date_format[column] = column_format
+        elif values.nunique() <= CATEGORY_MAX_DISTINCT_RATIO * len(values):
+            dtype[column] = "category"
+        elif TEXT_DTYPE is not None:
+            dtype[column] = TEXT_DTYPE
+
+    options = {}
+    if dtype:
+        options["dtype"] = dtype
+    if date_columns:
+        # Values that do not match the format leave the column as text rather than failing the read
+        options["parse_dates"] = date_columns
+        options["date_format"] = date_format
+    return options
+
+def apply_read_options(df, options):
+    """
+    Apply options from infer_read_options to a DataFrame that was read without them, such as a
+    chunk of a streamed file. Date columns are only converted if all their values parse.
+    """
+    for column, dtype in options.get("dtype", {}).items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype)
+    for column in options.get("parse_dates", []):
+        if column in df.columns and df[column].dtype == object:
+            parsed = pd.to_datetime(df[column], format=options["date_format"][column], errors="coerce")
+            if (parsed.isna() == df[column].isna()).all():
+                df[column] = parsed
+    return df
+
+def downcast_numeric(df):
+    """
+    Downcast int64 columns to the smallest integer type holding their range, and float64 columns to
+    float32 when that is lossless, so comparisons against other datasets are unchanged.
+    """
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == np.int64:
+            df[column] = pd.to_numeric(values, downcast="integer")
+        elif values.dtype == np.float64:
+            narrow = values.astype(np.float32)
+            if ((narrow.astype(np.float64) == values) | values.isna()).all():
+                df[column] = narrow
+    return df
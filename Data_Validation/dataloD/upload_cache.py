@@ -0,0 +1,170 @@
+import hashlib
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataloD.data_loader import load_dataset
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # without pyarrow every load parses the file
+    pa = None
+    feather = None
+
+# Where parsed uploads are kept and how much disk they may use before the least recently used are evicted
+DEFAULT_CACHE_DIR = os.path.join("uploads", "cache")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Part of every key, bumped whenever load_dataset starts parsing the same bytes differently
+CACHE_FORMAT_VERSION = 2
+
+def content_hash(path, block_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class CachedUpload:
+    """
+    Reference to a dataset in an UploadCache under key, e.g. one received by a StreamingUpload.
+    When the entry is missing, because it was never stored or has been evicted since, the
+    dataset is parsed from the raw file at path, if given, and cached.
+    """
+
+    def __init__(self, key, path=None):
+        self.key = key
+        self.path = path
+
+    def __repr__(self):
+        return f"CachedUpload({self.key!r}, {self.path!r})"
+
+class UploadCache:
+    """
+    Content-addressed cache of parsed datasets stored as uncompressed Feather (Arrow IPC) files.
+
+    Entries are keyed by the hash of the uploaded bytes and the loader options, so resubmitting
+    the same file skips parsing and is read back memory-mapped. Once the cache grows beyond
+    max_bytes, the least recently used entries are deleted.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return feather is not None
+
+    @staticmethod
+    def make_key(digest, load_options=None):
+        """Combine a content hash with the cache format and the loader options that shaped the parsed DataFrame."""
+        key = f"{digest}-v{CACHE_FORMAT_VERSION}"
+        if not load_options:
+            return key
+        options = repr(sorted(load_options.items())).encode("utf-8")
+        return f"{key}-{hashlib.sha256(options).hexdigest()[:16]}"
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.feather")
+
+    def get(self, key):
+        """Return the cached DataFrame for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+            os.utime(path)  # Mark as recently used
+        except (FileNotFoundError, OSError):
+            return None
+
+        # Text is read back as Arrow-backed strings without conversion, as load_dataset produces it
+        string_type = pd.StringDtype("pyarrow")
+        df = table.to_pandas(split_blocks=True, types_mapper={pa.string(): string_type, pa.large_string(): string_type}.get)
+
+        # Columns that were object when stored are restored as object, with NaN as read_csv produces
+        metadata = table.schema.pandas_metadata or {}
+        object_columns = [
+            column["name"] for column in metadata.get("columns", [])
+            if column.get("numpy_type") == "object" and column["name"] in df.columns
+        ]
+        if object_columns:
+            df[object_columns] = df[object_columns].astype(object).where(df[object_columns].notna(), np.nan)
+        return df
+
+    def put(self, key, df):
+        """
+        Store df under key and return whether it was stored.
+        DataFrames Arrow cannot represent are simply not cached.
+        """
+        if not self.enabled:
+            return False
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # Entries are content-addressed, an existing one only needs marking as used
+            return True
+        except FileNotFoundError:
+            pass
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_feather(temp_path, compression="uncompressed")
+            os.replace(temp_path, path)  # Atomic, concurrent writers of the same key are harmless
+        except (TypeError, ValueError, OSError):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".feather"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def load(self, path, **load_options):
+        """
+        Load a dataset through the cache, parsing it with load_dataset only on a miss.
+        `path` may also be a CachedUpload, whose DataFrame is read back without any parsing
+        unless its entry is missing.
+        """
+        if isinstance(path, CachedUpload):
+            df = self.get(path.key)
+            if df is not None:
+                return df
+            if path.path is None:
+                raise ValueError("The parsed upload is no longer cached. Please upload the file again.")
+            df = load_dataset(path.path, **load_options)
+            self.put(path.key, df)
+            return df
+        if not self.enabled:
+            return load_dataset(path, **load_options)
+
+        key = self.make_key(content_hash(path), load_options)
+        df = self.get(key)
+        if df is None:
+            df = load_dataset(path, **load_options)
+            self.put(key, df)
+        return df
@@ -0,0 +1,55 @@
+import hashlib
+import io
+
+class StreamingUpload:
+    """
+    Write-only file object that hashes an upload while it is being received.
+
+    Bytes written to it are hashed and, when `tee_path` is given, saved to that file, so the
+    upload cache can be looked up by content without reading the upload back. The stream is
+    finished by seek(0) or close(), which is what werkzeug does at the end of each file part.
+    """
+
+    def __init__(self, tee_path=None):
+        self.tee_path = tee_path
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._tee = open(tee_path, "wb") if tee_path else None
+        self._finished = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._finished:
+            raise ValueError("Write to a finished upload.")
+        data = bytes(data)
+        self._digest.update(data)
+        self.size += len(data)
+        if self._tee is not None:
+            self._tee.write(data)
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("Uploads can only be rewound to signal their end.")
+        self.finish()
+        return 0
+
+    def tell(self):
+        return self.size
+
+    def finish(self):
+        """Mark the end of the upload, safe to call more than once."""
+        if self._finished:
+            return
+        self._finished = True
+        if self._tee is not None:
+            self._tee.close()
+
+    close = finish
+
+    @property
+    def digest(self):
+        """SHA-256 of the bytes received, matching content_hash of the same file."""
+        return self._digest.hexdigest()
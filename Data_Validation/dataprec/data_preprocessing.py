@@ -1,5 +1,7 @@
 import pandas as pd
 
+from Data_Validation.dataquame.factorized import transform_distinct
+
 def preprocess_column(column, dtype, date_format=None, errors='coerce'):
     """
     Preprocesses a single column based on its data type.
@@ -18,7 +20,8 @@ def preprocess_column(column, dtype, date_format=None, errors='coerce'):
     elif dtype == "numeric":
         return pd.to_numeric(column, errors=errors)
     elif dtype == "text":
-        return column.astype(str).str.strip().str.lower()
+        # Normalize each distinct value once, repetitive columns are much cheaper this way
+        return transform_distinct(column, lambda values: values.astype(str).str.strip().str.lower())
     elif dtype == "category":
         return column.astype('category')
     else:
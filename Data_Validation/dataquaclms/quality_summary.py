@@ -3,7 +3,7 @@ def generate_quality_summary(df, scores_df):
         # Initialize the HTML content with a link to the external CSS
         html_content = []
         html_content.append("""
-        <link rel="stylesheet" href="Data_Validation\\dataquaclms\\Gqcls.css">
+        <link rel="stylesheet" href="/static/Data_Validation/dataquaclms/Gqcls.css">
 
         <div class="container">
             <div class="metrics-container">
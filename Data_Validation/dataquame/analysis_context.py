@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.sketches import HyperLogLog, hash_values
+
+# Odd 64-bit multiplier (the golden ratio) mixing several hashes into one, such as a row's from its columns'
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def _mixes_numbers(values):
+    """Whether an object column may hold numbers next to other values, which hash_pandas_object hashes as text."""
+    return values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) not in ("string", "bytes", "empty")
+
+def cell_hashes(values):
+    """
+    Hash the non-null values of a column so that equal values hash alike whatever column they are
+    in: numbers as floats, as hash_values does, and everything else as text. Object columns
+    mixing numbers with other values have their numbers picked out and hashed as floats too.
+    """
+    values = values.dropna()
+    if not _mixes_numbers(values):
+        return hash_values(values)
+    numbers = values.map(pd.api.types.is_number).to_numpy(dtype=bool)
+    return np.concatenate([
+        hash_values(values[numbers].astype("float64")),
+        pd.util.hash_pandas_object(values[~numbers].astype(str), index=False).to_numpy(),
+    ])
+
+def row_cell_hashes(values):
+    """
+    Hash every value of a column, missing ones alike, so that rows of equal values hash alike.
+    Numbers of object columns are hashed as floats, so 1 and "1" differ while 1 and 1.0 do not,
+    and -0.0 is hashed as 0.0, as DataFrame.duplicated compares them.
+    """
+    if pd.api.types.is_float_dtype(values):
+        values = values + 0.0
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    if _mixes_numbers(values):
+        numbers = (values.map(pd.api.types.is_number) & values.notna()).to_numpy(dtype=bool)
+        hashes[numbers] = hash_values(values[numbers].astype("float64"))
+    return hashes
+
+class AnalysisContext:
+    """
+    Lazily computed, memoized intermediates of one DataFrame, shared by the metrics and the reports.
+
+    Null masks, factorized codes, value counts, duplicate counts and dtype kinds are computed the
+    first time they are asked for and reused afterwards, so each runs once per request however
+    many metrics and report sections need it. Per-column results are keyed by column name and
+    whole-frame results by the current columns, so columns added to the DataFrame later, such as
+    a serial number, are picked up. Values must not be modified while the context is in use.
+    Computing an intermediate from two threads at once is harmless, one result simply wins.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._cache = {}
+
+    def _memo(self, key, compute):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = compute()
+            return value
+
+    def null_mask(self, column):
+        """Boolean array marking the missing values of a column."""
+        return self._memo(("null_mask", column), lambda: self.df[column].isnull().to_numpy())
+
+    def null_count(self, column):
+        return self._memo(("null_count", column), lambda: int(self.null_mask(column).sum()))
+
+    def null_counts(self):
+        """Missing values per column, as a Series, counted in one pass over the columns not counted yet."""
+        uncounted = [column for column in self.df.columns if ("null_count", column) not in self._cache]
+        if uncounted:
+            for column, count in self.df[uncounted].isnull().sum().items():
+                self._cache[("null_count", column)] = int(count)
+        return pd.Series({column: self.null_count(column) for column in self.df.columns}, dtype="int64")
+
+    def codes(self, column):
+        """
+        Factorized codes and distinct values of a column, as pd.factorize returns them, with -1
+        for missing values. Raises TypeError for unhashable values such as lists.
+        """
+        return self._memo(("codes", column), lambda: pd.factorize(self.df[column]))
+
+    def distinct_values(self, column):
+        """Distinct non-null values of a column, in order of first occurrence."""
+        def compute():
+            if ("codes", column) in self._cache:
+                return pd.Series(self._cache[("codes", column)][1])
+            # Without codes to keep, a plain hash table of the values is cheaper than factorizing
+            return pd.Series(self.df[column].dropna().unique())
+        return self._memo(("distinct_values", column), compute)
+
+    def distinct_count(self, column):
+        return len(self.distinct_values(column))
+
+    def value_counts(self, column):
+        """Occurrences of each distinct non-null value, in order of first occurrence."""
+        def count():
+            codes, uniques = self.codes(column)
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            return pd.Series(counts, index=pd.Index(uniques), name="count")
+        return self._memo(("value_counts", column), count)
+
+    def null_values(self, column):
+        """
+        Distinct missing values of a column, as Series.duplicated tells them apart: None and NaN
+        differ in object columns, though they share the missing code of pd.factorize.
+        """
+        def collect():
+            values = self.df[column]
+            if self.null_count(column) == 0:
+                return values.iloc[:0].to_numpy(dtype=object)
+            if values.dtype != object:
+                return values.iloc[[np.argmax(self.null_mask(column))]].to_numpy(dtype=object)
+            return pd.unique(values.to_numpy()[self.null_mask(column)])
+        return self._memo(("null_values", column), collect)
+
+    def null_kinds(self, column):
+        """Number of distinct missing values of a column, see null_values."""
+        return len(self.null_values(column))
+
+    def duplicated_count(self, column):
+        """
+        Number of values repeating an earlier value of a column, as Series.duplicated counts them:
+        every row past the first occurrence of each distinct value, missing ones included.
+        """
+        return len(self.df) - self.distinct_count(column) - self.null_kinds(column)
+
+    def row_hashes(self):
+        """64-bit hash of every row, combined from the row_cell_hashes of its columns one column at a time."""
+        def combine():
+            hashes = np.zeros(len(self.df), dtype=np.uint64)
+            for column in self.df.columns:
+                hashes *= HASH_MULTIPLIER
+                hashes ^= row_cell_hashes(self.df[column])
+            return hashes
+        return self._memo(("row_hashes", tuple(self.df.columns)), combine)
+
+    def duplicated_row_count(self):
+        """
+        Number of rows repeating an earlier row, counted from the row hashes, so exact up to 64-bit
+        hash collisions. They are never estimated: a sketch's error on the distinct rows would
+        swamp the few duplicates usually left once they are subtracted from all rows.
+        """
+        return self._memo(
+            ("duplicated_row_count", tuple(self.df.columns)),
+            lambda: len(self.df) - len(pd.unique(self.row_hashes())),
+        )
+
+    def distinct_cells(self, error=None):
+        """
+        Number of distinct values over every cell of the DataFrame, each distinct missing value
+        (None, NaN, NaT...) counting as one.
+
+        The distinct values of each column are hashed with cell_hashes, so 1 and 1.0 are one value,
+        and the hashes of all columns are counted together, so the cells are never gathered into one
+        array. When error is given, they are estimated with a HyperLogLog sketch of that relative
+        error, fed each column's hashes in turn.
+        """
+        def count():
+            null_values = [self.null_values(column) for column in self.df.columns]
+            missing = len(pd.unique(np.concatenate(null_values))) if null_values else 0
+            if error is None:
+                hashes = [cell_hashes(self.distinct_values(column)) for column in self.df.columns]
+                return len(pd.unique(np.concatenate(hashes))) + missing if hashes else 0
+            sketch = HyperLogLog(error)
+            for column in self.df.columns:
+                sketch.add_hashes(cell_hashes(self.df[column]))
+            return min(sketch.count(), self.df.size) + missing
+        return self._memo(("distinct_cells", tuple(self.df.columns), error), count)
+
+    def dtype_kind(self, column):
+        """Kind of a column's dtype: 'categorical', 'boolean', 'numeric', 'datetime', 'text' or 'other'."""
+        def classify():
+            dtype = self.df[column].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                return "categorical"
+            if pd.api.types.is_bool_dtype(dtype):
+                return "boolean"
+            if pd.api.types.is_numeric_dtype(dtype):
+                return "numeric"
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                return "datetime"
+            if pd.api.types.is_string_dtype(dtype):
+                return "text"
+            return "other"
+        return self._memo(("dtype_kind", column, str(self.df[column].dtype)), classify)
+
+    def dtype_kinds(self):
+        """Number of columns of each dtype kind."""
+        kinds = {"text": 0, "categorical": 0, "numeric": 0, "boolean": 0, "datetime": 0, "other": 0}
+        for column in self.df.columns:
+            kinds[self.dtype_kind(column)] += 1
+        return kinds
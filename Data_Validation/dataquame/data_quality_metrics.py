@@ -1,70 +1,81 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import re
+
+from Data_Validation.dataquame.metric_accumulators import (
+    AccuracyAccumulator,
+    ApproximateUniquenessAccumulator,
+    CompletenessAccumulator,
+    ConsistencyAccumulator,
+    METRICS,
+    QUANTILE_SKETCH_K,
+    ReliabilityAccumulator,
+    SampledScoreAccumulator,
+    ScoreAccumulator,
+    TimelinessAccumulator,
+    UniquenessAccumulator,
+    ValidityAccumulator,
+    sketched_reliability,
+)
+from Data_Validation.dataquame.key_join import HashJoin, SortMergeJoin, align_on_keys
+from Data_Validation.dataquame.sketches import kll_rank_error
+from Data_Validation.dataquame.validators import resolve_validity_rules
 
 def completeness_score(column):
     """Calculate the completeness score of a column."""
-    if len(column) == 0:
-        return 0.0  # Return 0% if the column is empty
-    return (len(column) - column.isnull().sum()) / len(column) * 100
+    return CompletenessAccumulator().update(column).finalize()
 
-def uniqueness_score(column):
-    """Calculate the uniqueness score of a column."""
-    if len(column) == 0:
-        return 0.0  # Return 0% if the column is empty
-    return column.nunique() / len(column) * 100
+def uniqueness_score(column, error=None):
+    """Calculate the uniqueness score of a column, estimated with a HyperLogLog sketch when error is given."""
+    if error is not None:
+        return ApproximateUniquenessAccumulator(error).update(column).finalize()
+    return UniquenessAccumulator().update(column).finalize()
 
 def validity_score(column, validation_function=None):
     """Calculate the validity score of a column based on a validation function."""
-    if len(column) == 0:
-        return 0.0  # Return 0% if the column is empty
-
-    if validation_function is None:
-        if pd.api.types.is_numeric_dtype(column):
-            validation_function = lambda x: not pd.isna(x)
-        elif pd.api.types.is_datetime64_any_dtype(column):
-            validation_function = lambda x: not pd.isna(x)
-        else:
-            validation_function = lambda x: isinstance(x, str) and x.strip() != ""
-    
-    valid_entries = column.apply(validation_function).sum()
-    return valid_entries / len(column) * 100
+    return ValidityAccumulator(validation_function).update(column).finalize()
 
 def timeliness_score(column, threshold_date):
     """Calculate the timeliness score of a datetime column."""
     if pd.api.types.is_datetime64_any_dtype(column):
-        if threshold_date is None:
-            raise ValueError("Threshold date must be provided and cannot be None.")
-        
-        threshold_date = pd.to_datetime(threshold_date).tz_localize(None)
-        timely_entries = (column >= threshold_date).sum()
-        return timely_entries / len(column) * 100
+        return TimelinessAccumulator(threshold_date).update(column).finalize()
 
     return 100.0  # If not a datetime column, assume 100% timeliness
 
-def accuracy_score(df, df2, column_name, threshold=None):
-    """Calculates the accuracy score between two DataFrames for a specific column."""
+def reliability_score(column):
+    """
+    Calculate the reliability score of a numeric column, the share of entries within the 1.5 IQR
+    outlier fences of its quartiles.
+    """
+    return ReliabilityAccumulator(exact=True).update(column).finalize()
+
+def _matched_rows(df, df2, join_keys):
+    """Rows of df and df2 with the same keys, aligned, or both DataFrames as they are without keys."""
+    if join_keys is None:
+        return df, df2
+    pairs = [(chunk, reference_chunk) for chunk, reference_chunk in HashJoin(df, df2, join_keys) if reference_chunk is not None]
+    if not pairs:
+        return df.iloc[:0], df2.iloc[:0]
+    return pairs[0]
+
+def accuracy_score(df, df2, column_name, threshold=None, join_keys=None):
+    """Calculates the accuracy score between two DataFrames for a specific column, rows aligned on join_keys if given."""
 
     # Check if both columns exist in the respective DataFrames
     if column_name not in df.columns or column_name not in df2.columns:
         raise ValueError(f"Column '{column_name}' not found in both DataFrames.")
 
-    # Handling the case where we compare numeric values with a threshold
-    if pd.api.types.is_numeric_dtype(df[column_name]) and threshold is not None:
-        correct_entries = (abs(df[column_name] - df2[column_name]) <= threshold).sum()
-    else:
-        # Compare string or categorical columns directly (ignoring NaN comparisons)
-        correct_entries = (df[column_name] == df2[column_name]).sum()
-
-    # Count the total number of non-NaN entries in both columns
-    total_entries = len(df[column_name])
-    total_valid_entries = len(df[column_name].dropna())
-
-    # Calculate accuracy percentage
-    accuracy_percentage = (correct_entries / total_valid_entries) * 100 if total_valid_entries > 0 else 100
-    return accuracy_percentage
+    df, df2 = _matched_rows(df, df2, join_keys)
+    return AccuracyAccumulator(threshold).update(df[column_name], df2[column_name]).finalize()
 
-def consistency_score(df, df2, column1, column2=None):
-    """Calculates the consistency score by comparing two columns."""
+def consistency_score(df, df2, column1, column2=None, join_keys=None):
+    """Calculates the consistency score by comparing two columns, rows aligned on join_keys if given."""
     
     if column2 is None:
         column2 = column1  # If column2 is not provided, compare column1 with itself
@@ -73,65 +84,284 @@ def consistency_score(df, df2, column1, column2=None):
     if column1 not in df.columns or column2 not in df2.columns:
         raise ValueError(f"Columns '{column1}' or '{column2}' are not found in their respective DataFrames.")
 
-    # Compare the two columns row by row
-    consistency = 0
-    total = len(df)
-
-    for i in range(total):
-        val1 = df.iloc[i][column1]
-        val2 = df2.iloc[i][column2]
-
-        # If both values are NaN, consider them consistent
-        if pd.isna(val1) and pd.isna(val2):
-            consistency += 1
-        # If both values are the same (non-NaN), consider them consistent
-        elif val1 == val2:
-            consistency += 1
-        # If one value is NaN and the other is not, consider it inconsistent
-        elif pd.isna(val1) or pd.isna(val2):
-            consistency += 0
-        # If values are different (and neither are NaN), consider it inconsistent
-        else:
-            consistency += 0
-
-    # Calculate consistency percentage
-    consistency_percentage = (consistency / total) * 100 if total > 0 else 100
-    return consistency_percentage
-
-def calculate_scores(df,df2, threshold_date=None, reference_columns=None):
-    """Calculates data quality scores for each column in a DataFrame."""
-    if threshold_date is None:
-        threshold_date = pd.to_datetime("today")
+    df, df2 = _matched_rows(df, df2, join_keys)
+
+    # Compare the two columns position by position, the reference may be longer
+    if len(df2) < len(df):
+        raise ValueError(f"Column '{column2}' has fewer rows than '{column1}' and cannot be compared position by position.")
+
+    return ConsistencyAccumulator().update(df[column1], df2[column2].iloc[:len(df)]).finalize()
+
+# DataFrames shared with worker processes, keyed by a token per calculate_scores call.
+# Forked workers inherit this dictionary instead of receiving pickled copies.
+_SHARED_FRAMES = {}
+
+def _score_columns(df, df2, columns, threshold_date, validation_functions, chunksize, distinct_error=None,
+                   context=None):
+    """Score a subset of columns, whole or chunk by chunk. Columns scored whole reuse the context's intermediates."""
+    accumulator = ScoreAccumulator(
+        columns, threshold_date, validation_functions, distinct_error=distinct_error, exact_reliability=chunksize is None
+    )
+
+    if chunksize is None:
+        return accumulator.update(df, df2, context=context).finalize()
+
+    for start in range(0, len(df), chunksize):
+        accumulator.update(df.iloc[start:start + chunksize], df2.iloc[start:start + chunksize])
+    return accumulator.finalize()
+
+def _sample_scores(df, df2, threshold_date, validation_functions, chunksize, distinct_error, sample_size, stratify_by):
+    """Estimate the scores from a sample drawn in one pass over the rows, chunk by chunk when chunksize is given."""
+    accumulator = SampledScoreAccumulator(
+        df.columns, sample_size, threshold_date, validation_functions, distinct_error=distinct_error,
+        stratify_by=stratify_by, exact_reliability=chunksize is None,
+    )
+    step = chunksize or max(len(df), 1)
+    for start in range(0, len(df), step):
+        accumulator.update(df.iloc[start:start + step], df2.iloc[start:start + step])
+    return accumulator.finalize()
+
+def _join_scores(df, df2, join_keys, threshold_date, validation_functions, chunksize, distinct_error):
+    """Score df against the rows of df2 with the same keys, and count the rows each side could not match."""
+    join = align_on_keys(df, df2, join_keys, chunksize)
+    accumulator = ScoreAccumulator(df.columns, threshold_date, validation_functions, distinct_error=distinct_error)
+    for chunk, reference_chunk in join:
+        accumulator.update(chunk, reference_chunk)
+    scores_df = accumulator.finalize()
+    scores_df.attrs["join"] = {"keys": join.join_keys, "method": join.method, **join.counts}
+    return scores_df
+
+def _score_shared_columns(token, columns, threshold_date, validation_functions, chunksize, distinct_error):
+    """Worker entry point: score a group of columns of DataFrames shared under token."""
+    shared = _SHARED_FRAMES[token]
+    if isinstance(shared, str):
+        # Without fork the frames were written to Arrow files, only this group's columns are mapped in
+        from pyarrow import feather
+
+        df = feather.read_table(os.path.join(shared, "df.feather"), columns=columns, memory_map=True).to_pandas()
+        df2 = feather.read_table(os.path.join(shared, "df2.feather"), columns=columns, memory_map=True).to_pandas()
+    else:
+        df, df2 = shared
+    return _score_columns(df, df2, columns, threshold_date, validation_functions, chunksize, distinct_error)
+
+def _register_shared_frames(token, shared):
+    _SHARED_FRAMES[token] = shared
+
+def _score_columns_in_parallel(df, df2, columns, threshold_date, validation_functions, chunksize, n_jobs,
+                               distinct_error=None):
+    """Spread column groups across a process pool and reassemble the scores in column order."""
+    n_jobs = min(n_jobs, len(columns))
+    # A few groups per worker keeps the pool busy when some columns are slower than others
+    groups = [list(group) for group in np.array_split(np.array(columns, dtype=object), n_jobs * 4) if len(group)]
 
-    detailed_scores = {}
+    token = uuid.uuid4().hex
+    spill_dir = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        _SHARED_FRAMES[token] = (df, df2)
+        pool = ProcessPoolExecutor(n_jobs, mp_context=multiprocessing.get_context("fork"))
+    else:
+        spill_dir = tempfile.mkdtemp(prefix="dq_scores_")
+        try:
+            df[columns].reset_index(drop=True).to_feather(os.path.join(spill_dir, "df.feather"), compression="uncompressed")
+            df2[columns].reset_index(drop=True).to_feather(os.path.join(spill_dir, "df2.feather"), compression="uncompressed")
+            shared = spill_dir
+        except (ImportError, TypeError, ValueError):
+            # Frames Arrow cannot store are pickled once per worker instead
+            shared = (df.reset_index(drop=True), df2.reset_index(drop=True))
+        pool = ProcessPoolExecutor(n_jobs, initializer=_register_shared_frames, initargs=(token, shared))
+
+    try:
+        with pool:
+            futures = [
+                pool.submit(
+                    _score_shared_columns, token, group, threshold_date, validation_functions, chunksize, distinct_error
+                )
+                for group in groups
+            ]
+            group_scores = [future.result() for future in futures]
+    finally:
+        _SHARED_FRAMES.pop(token, None)
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    scores_df = pd.concat(group_scores).loc[columns]
+    scores_df.attrs.update(group_scores[0].attrs)
+    # Groups may differ in which metrics had to be estimated
+    approximate = {metric for scores in group_scores for metric in scores.attrs["approximate"]}
+    scores_df.attrs["approximate"] = [metric for metric in METRICS if metric in approximate]
+    return scores_df
+
+def _compute_scores(df, df2, columns, threshold_date, validation_functions, chunksize, n_jobs, distinct_error,
+                    context=None):
+    """Score the given columns serially or on a process pool, where the context is not shared."""
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs is not None and n_jobs > 1 and len(columns) > 1:
+        return _score_columns_in_parallel(
+            df, df2, columns, threshold_date, validation_functions, chunksize, n_jobs, distinct_error
+        )
+    return _score_columns(df, df2, columns, threshold_date, validation_functions, chunksize, distinct_error, context)
+
+def _compute_scores_with_cache(df, df2, threshold_date, validation_functions, chunksize, n_jobs, distinct_error,
+                               score_cache, context=None):
+    """Reuse memoized scores of unchanged columns and only compute the others."""
+    columns = list(df.columns)
+    keys = {
+        col: score_cache.make_key(
+            df[col], df2[col], threshold_date, validation_functions.get(col), distinct_error,
+            exact_reliability=chunksize is None,
+        )
+        for col in columns
+    }
+    detailed_scores = {col: score_cache.get(keys[col]) for col in columns}
 
+    changed_columns = [col for col in columns if detailed_scores[col] is None]
+    if changed_columns:
+        fresh_scores = _compute_scores(
+            df, df2, changed_columns, threshold_date, validation_functions, chunksize, n_jobs, distinct_error, context
+        )
+        for col, scores in fresh_scores.iterrows():
+            detailed_scores[col] = scores.to_dict()
+            score_cache.put(keys[col], detailed_scores[col])
+
+    scores_df = pd.DataFrame(detailed_scores, index=METRICS).T
+    scores_df.attrs["approximate"] = ["Uniqueness"] if distinct_error is not None else []
+    if chunksize is not None and sketched_reliability(df):
+        scores_df.attrs["approximate"].append("Reliability")
+    scores_df.attrs["distinct_error"] = distinct_error
+    scores_df.attrs["quantile_rank_error"] = kll_rank_error(QUANTILE_SKETCH_K)
+    return scores_df
+
+def calculate_scores(df, df2, threshold_date=None, reference_columns=None, chunksize=None, n_jobs=None,
+                     distinct_error=None, validity_rules=None, score_cache=None, sample_size=None, stratify_by=None,
+                     join_keys=None, context=None):
+    """
+    Calculates data quality scores for each column in a DataFrame.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to analyze.
+        df2 (pd.DataFrame): The reference DataFrame, with the same columns and index as df unless
+            join_keys is given.
+        threshold_date (optional): Threshold date for timeliness. Defaults to the start of today.
+        reference_columns: Unused, kept for compatibility.
+        chunksize (int, optional): Score the datasets this many rows at a time and merge the results.
+            Reliability, the share of numeric entries within the 1.5 IQR outlier fences, then takes
+            its quartiles from a mergeable quantile sketch rather than from the whole column.
+        n_jobs (int, optional): Number of worker processes scoring groups of columns in parallel.
+            -1 uses every CPU. Defaults to scoring serially in the current process.
+        distinct_error (float, optional): When given, Uniqueness is estimated with a HyperLogLog
+            sketch of this relative standard error instead of counted exactly.
+        validity_rules (dict, optional): Maps columns to the validator checking them, e.g.
+            {"email": "email", "amount": {"validator": "range", "min": 0}}. Columns without a rule
+            score 100% validity. Defaults to the email validator on columns named like "email".
+        score_cache (ScoreCache, optional): Memo of per-column scores. Columns whose values and
+            reference values are unchanged since an earlier call are not scored again.
+        sample_size (int, optional): When given, the scores are estimated from a sample of at most
+            this many rows, drawn in one pass, instead of computed over every row. Uniqueness is
+            still counted over every row. n_jobs and score_cache are not used for sampled scores.
+        stratify_by (str, optional): Sample up to sample_size rows within each value of this
+            column rather than uniformly, so small groups are represented.
+        join_keys (str or list, optional): Key columns rows of df and df2 are aligned on for
+            Accuracy and Consistency, instead of by position. The datasets are joined with a hash
+            join, or an external sort-merge join when the hash table would not fit in memory.
+            Rows of df without a match still count towards the other metrics. Cannot be combined
+            with sample_size, and n_jobs and score_cache are not used.
+        context (AnalysisContext, optional): Memoized intermediates of df, such as null masks and
+            factorized codes, shared with the reports. Completeness, Validity and Uniqueness take
+            them from the context, computing them there once, when df is scored whole in this process.
+
+    Returns:
+        pd.DataFrame: A DataFrame with data quality scores for each column. The metrics that were
+            estimated are listed in scores_df.attrs["approximate"]. Sampled scores come with
+            95% confidence intervals in scores_df.attrs["confidence_intervals"], keyed by column
+            and metric, and a description of the sample in scores_df.attrs["sample"]. With
+            join_keys, scores_df.attrs["join"] holds the join method and the number of matched,
+            left-only and right-only rows.
+    """
     for col in df.columns:
-        column_data = df[col]
-
-        # Calculate scores for each column
-        column_scores = {
-            "Completeness": completeness_score(column_data),
-            "Timeliness": timeliness_score(column_data, threshold_date) if pd.api.types.is_datetime64_any_dtype(column_data) else 100,
-            "Validity": validity_score(
-                column_data,
-                lambda x: bool(
-                    re.match(
-                        r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$", str(x)
-                    )
-                ),
-            ) if "email" in col.lower() else 100,
-            "Accuracy": accuracy_score(df, df2, col,threshold=None),
-            "Uniqueness": uniqueness_score(column_data),
-            "Consistency": consistency_score(df,df2, col)
-        }
-
-        detailed_scores[col] = column_scores
-
-    scores_df = pd.DataFrame(detailed_scores).T
+        if col not in df2.columns:
+            raise ValueError(f"Column '{col}' not found in both DataFrames.")
+    if join_keys is None and not df.index.equals(df2.index):
+        raise ValueError("Can only compare identically-labeled Series objects")
+    if join_keys is not None and sample_size is not None:
+        raise ValueError("Scores of datasets aligned on join keys cannot be estimated from a sample.")
+    if context is not None and context.df is not df:
+        raise ValueError("An analysis context can only be used with the DataFrame it was built for.")
+    if threshold_date is None:
+        threshold_date = pd.Timestamp.today().normalize()
+
+    validation_functions = resolve_validity_rules(validity_rules, df.columns)
+
+    if join_keys is not None:
+        return _join_scores(df, df2, join_keys, threshold_date, validation_functions, chunksize, distinct_error)
+    if sample_size is not None:
+        return _sample_scores(
+            df, df2, threshold_date, validation_functions, chunksize, distinct_error, sample_size, stratify_by
+        )
+    if score_cache is not None:
+        return _compute_scores_with_cache(
+            df, df2, threshold_date, validation_functions, chunksize, n_jobs, distinct_error, score_cache, context
+        )
+    return _compute_scores(
+        df, df2, list(df.columns), threshold_date, validation_functions, chunksize, n_jobs, distinct_error, context
+    )
+
+def _aligned_chunks(chunks, reference_chunks):
+    reference_chunks = iter(reference_chunks)
+    for chunk in chunks:
+        reference_chunk = next(reference_chunks, None)
+        if reference_chunk is None:
+            raise ValueError("The reference dataset has fewer rows than the dataset being scored.")
+        yield chunk, reference_chunk
+
+def calculate_scores_chunked(chunks, reference_chunks, threshold_date=None, distinct_error=None, validity_rules=None,
+                             sample_size=None, stratify_by=None, join_keys=None):
+    """
+    Calculates data quality scores from two aligned streams of chunks.
+
+    Args:
+        chunks (iterable): DataFrame chunks of the dataset, e.g. from load_dataset(path, chunksize=...).
+        reference_chunks (iterable): Chunks of the reference dataset covering the same rows.
+        threshold_date (optional): Threshold date for timeliness. Defaults to the start of today.
+        distinct_error (float, optional): Estimate Uniqueness with a HyperLogLog sketch of this error.
+        validity_rules (dict, optional): Maps columns to validators, as in calculate_scores.
+        sample_size (int, optional): Estimate the scores from a sample of at most this many rows.
+        stratify_by (str, optional): Column the sample is stratified by, as in calculate_scores.
+        join_keys (str or list, optional): Align the datasets on these key columns with an external
+            sort-merge join rather than chunk by chunk. Cannot be combined with sample_size.
+
+    Returns:
+        pd.DataFrame: A DataFrame with data quality scores for each column.
+    """
+    join = None
+    if join_keys is not None:
+        if sample_size is not None:
+            raise ValueError("Scores of datasets aligned on join keys cannot be estimated from a sample.")
+        join = SortMergeJoin(chunks, reference_chunks, join_keys)
+        pairs = iter(join)
+    else:
+        pairs = _aligned_chunks(chunks, reference_chunks)
+
+    accumulator = None
+    for chunk, reference_chunk in pairs:
+        if accumulator is None:
+            validation_functions = resolve_validity_rules(validity_rules, chunk.columns)
+            if sample_size is not None:
+                accumulator = SampledScoreAccumulator(
+                    chunk.columns, sample_size, threshold_date, validation_functions, distinct_error=distinct_error,
+                    stratify_by=stratify_by,
+                )
+            else:
+                accumulator = ScoreAccumulator(chunk.columns, threshold_date, validation_functions, distinct_error=distinct_error)
+        accumulator.update(chunk, reference_chunk)
+
+    if accumulator is None:
+        raise ValueError("The dataset is empty.")
+    scores_df = accumulator.finalize()
+    if join is not None:
+        scores_df.attrs["join"] = {"keys": join.join_keys, "method": join.method, **join.counts}
     return scores_df
 
 def overall_quality_score(scores_df):
     """Calculate the overall quality score as the mean of all scores."""
     return scores_df.mean().mean()
-
-
@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.analysis_context import AnalysisContext, HASH_MULTIPLIER
+
+# Bytes per shingle the texts compared for near-duplicates are cut into, at most 8
+SHINGLE_SIZE = 3
+
+# MinHash signature length, split into LSH bands of equal rows. Texts sharing a whole band are
+# candidates: with 16 bands of 4, pairs 70% similar almost always are and pairs 30% similar rarely
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# Estimated Jaccard similarity of the shingles of two candidates above which they are near-duplicates.
+# "john doe" and "jon doe" with the same email are about 0.74 similar
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Distinct texts shingled and MinHashed at a time, bounding the memory their shingles take
+MINHASH_BATCH = 50_000
+
+# Candidate pairs whose signatures are compared at a time
+_VERIFY_BATCH = 1_000_000
+
+# Clusters of each kind listed in the detailed report, largest first
+REPORTED_CLUSTERS = 10
+
+# Buckets of at most this many texts have every pair of their texts compared. Larger ones only
+# compare each text with the bucket's first, so their pairs of texts both unlike the first are
+# only found through another band they share.
+SMALL_BUCKET = 8
+
+def normalize_texts(df, columns):
+    """
+    Text compared for near-duplicates of each row: its values in columns, lowercased with runs of
+    whitespace collapsed, separated by a unit separator. Missing values are empty.
+    """
+    texts = None
+    for column in columns:
+        # Only the distinct values of the column are normalized
+        codes, uniques = pd.factorize(df[column])
+        normalized = np.array([" ".join(str(value).lower().split()) for value in uniques] + [""], dtype=object)
+        values = pd.Series(normalized[codes], dtype=object)
+        texts = values if texts is None else texts + "\x1f" + values
+    return texts
+
+def shingles(texts, size=SHINGLE_SIZE):
+    """
+    Shingles of each text, every run of `size` bytes of its UTF-8 encoding packed into an integer,
+    flattened, and the offset of each text's first shingle. Texts shorter than a shingle are a
+    single shingle of their own. All texts are shingled at once from their concatenated bytes.
+    """
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.intp, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded) + b"\0", dtype=np.uint8)
+    counts = np.maximum(lengths - size + 1, 1)
+    offsets = np.r_[0, np.cumsum(counts)[:-1]].astype(np.intp)
+    text_starts = np.r_[0, np.cumsum(lengths)[:-1]].astype(np.intp)
+
+    starts = np.repeat(text_starts - offsets, counts) + np.arange(counts.sum())
+    ends = np.repeat(text_starts + lengths, counts)
+    packed = np.zeros(len(starts), dtype=np.uint64)
+    for byte in range(size):
+        positions = starts + byte
+        # Bytes past the end of a short text are zero, the concatenation ends with a spare zero byte
+        values = np.where(positions < ends, data[np.minimum(positions, len(data) - 1)], 0)
+        packed = (packed << np.uint64(8)) | values.astype(np.uint64)
+    return packed, offsets
+
+class MinHasher:
+    """
+    MinHash signatures of texts, from `permutations` multiply-add-shift hash functions of their shingles.
+    The share of equal signature entries of two texts estimates the Jaccard similarity of their shingles.
+    """
+
+    def __init__(self, permutations=MINHASH_PERMUTATIONS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(1, 2 ** 63, permutations, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.increments = rng.integers(0, 2 ** 63, permutations, dtype=np.uint64)
+
+    def signatures(self, texts):
+        """Signature of each text, as a (texts, permutations) uint32 array."""
+        packed, offsets = shingles(texts)
+        signatures = np.empty((len(texts), len(self.multipliers)), dtype=np.uint32)
+        if len(texts) == 0:
+            return signatures
+        permuted = np.empty_like(packed)
+        for position, (multiplier, increment) in enumerate(zip(self.multipliers, self.increments)):
+            # Arithmetic wraps around at 2**64 and the top 32 bits are the permuted hash. They order
+            # values as the whole products do, so the minimum is taken before shifting.
+            np.multiply(packed, multiplier, out=permuted)
+            np.add(permuted, increment, out=permuted)
+            signatures[:, position] = np.minimum.reduceat(permuted, offsets) >> np.uint64(32)
+        return signatures
+
+def band_keys(signatures, bands=LSH_BANDS):
+    """Bucket key of each signature in each LSH band, as a (bands, signatures) uint64 array."""
+    keys = np.zeros((bands, len(signatures)), dtype=np.uint64)
+    for band, rows in enumerate(np.array_split(np.arange(signatures.shape[1]), bands)):
+        for row in rows:
+            keys[band] *= HASH_MULTIPLIER
+            keys[band] ^= signatures[:, row].astype(np.uint64)
+    return keys
+
+def _connected_components(count, left, right):
+    """Label of the component of each of count nodes joined by the left-right edges, its smallest node."""
+    labels = np.arange(count)
+    while True:
+        joined = labels.copy()
+        lowest = np.minimum(labels[left], labels[right])
+        np.minimum.at(joined, left, lowest)
+        np.minimum.at(joined, right, lowest)
+        joined = joined[joined]
+        if np.array_equal(joined, labels):
+            return labels
+        labels = joined
+
+def near_duplicate_labels(texts, threshold=NEAR_DUPLICATE_THRESHOLD, seed=0):
+    """
+    Cluster texts that are near-duplicates of each other, without comparing every pair.
+
+    Texts are MinHashed and bucketed by each LSH band. Pairs of texts of a bucket are joined when
+    their signatures agree on at least threshold of their entries. Every pair of a bucket of up
+    to SMALL_BUCKET texts is compared, in larger buckets only each text and the bucket's first,
+    which trades some recall for a number of comparisons linear in the bucket size.
+
+    Returns:
+        np.ndarray: Cluster label of each text, the position of a text of the cluster.
+    """
+    hasher = MinHasher(seed=seed)
+    signatures = np.concatenate([
+        hasher.signatures(texts[start:start + MINHASH_BATCH]) for start in range(0, len(texts), MINHASH_BATCH)
+    ]) if len(texts) else np.empty((0, MINHASH_PERMUTATIONS), dtype=np.uint32)
+
+    # Candidate pairs of every band, each pair encoded as larger * texts + smaller position so
+    # pairs found in several bands are verified once
+    pairs = []
+    keys = band_keys(signatures)
+    for band_key in keys:
+        order = np.argsort(band_key, kind="stable").astype(np.int64)
+        sorted_keys = band_key[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(order)])
+        bucket_start = np.repeat(starts, sizes)
+        rank = np.arange(len(order)) - bucket_start
+        small = np.repeat(sizes <= SMALL_BUCKET, sizes)
+
+        # Each text of a small bucket with every text before it, of a large one with its first
+        others = [(np.flatnonzero(small & (rank >= distance)), distance) for distance in range(1, SMALL_BUCKET)]
+        candidates = [(positions, order[positions - distance]) for positions, distance in others]
+        large = np.flatnonzero(~small & (rank > 0))
+        candidates.append((large, order[bucket_start[large]]))
+        for positions, heads in candidates:
+            members = order[positions]
+            pairs.append(np.maximum(members, heads) * len(texts) + np.minimum(members, heads))
+    pairs = np.sort(np.concatenate(pairs)) if pairs else np.empty(0, dtype=np.int64)
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+
+    left, right = [], []
+    for start in range(0, len(pairs), _VERIFY_BATCH):
+        members, heads = np.divmod(pairs[start:start + _VERIFY_BATCH], len(texts))
+        similar = (signatures[members] == signatures[heads]).mean(axis=1) >= threshold
+        left.append(members[similar])
+        right.append(heads[similar])
+
+    if not left:
+        return np.arange(len(texts))
+    return _connected_components(len(texts), np.concatenate(left), np.concatenate(right))
+
+def _clusters(labels, rows=None, eligible=None):
+    """
+    Summarize the clusters of rows sharing a label: their number, the rows in them and the
+    REPORTED_CLUSTERS largest, as arrays of row positions. Only labels of more than one row form a
+    cluster, and only those marked in `eligible`, a boolean array indexed by label, when it is given.
+    """
+    rows = np.arange(len(labels)) if rows is None else rows
+    codes, uniques = pd.factorize(labels)
+    sizes = np.bincount(codes, minlength=len(uniques))
+    clustered = sizes > 1
+    if eligible is not None:
+        clustered &= eligible[uniques]
+    clustered = np.flatnonzero(clustered)
+    largest = clustered[np.argsort(-sizes[clustered], kind="stable")[:REPORTED_CLUSTERS]]
+    return {
+        "clusters": len(clustered),
+        "rows": int(sizes[clustered].sum()),
+        "largest": [rows[codes == code] for code in largest],
+    }
+
+def find_duplicates(df, near_duplicate_columns=None, context=None, threshold=NEAR_DUPLICATE_THRESHOLD, seed=0):
+    """
+    Find exact duplicate rows, and near-duplicates on selected columns.
+
+    Exact duplicates share the row hash of the AnalysisContext. Near-duplicates are found with
+    MinHash and LSH over the shingles of the values of near_duplicate_columns, each distinct text
+    hashed once, so they scale to tens of millions of rows without comparing every pair.
+
+    Args:
+        df (pd.DataFrame): The dataset to check.
+        near_duplicate_columns (list, optional): Columns whose values are compared for near-duplicates,
+            e.g. ["name", "email"]. Only exact duplicates are looked for when None.
+        context (AnalysisContext, optional): Memoized intermediates of df, its row hashes are reused.
+        threshold (float): Estimated share of shingles two rows' texts must have in common.
+        seed (int): Seed of the MinHash functions.
+
+    Returns:
+        dict: "exact" and, with near_duplicate_columns, "near", each holding the number of
+            "clusters", the "rows" in them and the REPORTED_CLUSTERS largest clusters as arrays of
+            row positions under "largest". "near" also holds its "columns" and "threshold". Near
+            clusters hold at least two different texts, and rows with every selected column
+            missing are never near-duplicates.
+    """
+    if context is None:
+        context = AnalysisContext(df)
+    elif context.df is not df:
+        raise ValueError("An analysis context can only be used with the DataFrame it was built for.")
+
+    duplicates = {"exact": _clusters(context.row_hashes())}
+    if not near_duplicate_columns:
+        return duplicates
+
+    columns = [near_duplicate_columns] if isinstance(near_duplicate_columns, str) else list(near_duplicate_columns)
+    for column in columns:
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' to find near-duplicates on was not found in the dataset.")
+
+    # Every distinct text is MinHashed once, rows of equal texts share its cluster
+    codes, distinct_texts = pd.factorize(normalize_texts(df, columns))
+    compared = np.flatnonzero([text.strip("\x1f") != "" for text in distinct_texts])
+    labels = np.arange(len(distinct_texts))
+    labels[compared] = compared[near_duplicate_labels([distinct_texts[i] for i in compared], threshold, seed)]
+
+    # Clusters of a single distinct text are exact duplicates on these columns, not near-duplicates
+    texts_per_label = np.bincount(labels[compared], minlength=len(distinct_texts))
+    rows = np.flatnonzero(np.isin(codes, compared))
+    duplicates["near"] = {
+        "columns": columns,
+        "threshold": threshold,
+        **_clusters(labels[codes[rows]], rows, eligible=texts_per_label > 1),
+    }
+    return duplicates
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+# Kinds of object columns whose distinct values factorize without merging values that print
+# differently, as 1, 1.0 and True would in a mixed column
+_SAFE_OBJECT_KINDS = {"string", "bytes", "integer", "floating", "boolean", "datetime", "date", "empty"}
+
+def _has_negative_zero(values):
+    """Factorizing merges -0.0 into 0.0, though they print differently."""
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return bool(np.signbit(values[values == 0]).any())
+
+def _can_factorize(column):
+    if isinstance(column.dtype, np.dtype):
+        if column.dtype.kind == "f":
+            return not _has_negative_zero(column)
+        if column.dtype != object:
+            return True
+        kind = pd.api.types.infer_dtype(column, skipna=True)
+        return kind in _SAFE_OBJECT_KINDS and not (kind == "floating" and _has_negative_zero(column))
+    # Categoricals already map over their categories, other extension types convert values on apply
+    return pd.api.types.is_string_dtype(column.dtype) and not isinstance(column.dtype, pd.CategoricalDtype)
+
+def transform_distinct(column, transform, factorize=pd.factorize):
+    """
+    Run a Series -> Series transform over the distinct values of a column only and broadcast
+    the results back to every row.
+
+    The transform sees the first occurrence of each distinct value, with the column's dtype, so it
+    behaves as if it had been given the whole column. Missing values of object columns are passed
+    through individually, since None, NaN and NA collapse into a single code when factorized.
+    `factorize` can return codes already computed for the column, such as AnalysisContext.codes.
+    """
+    if len(column) == 0 or not _can_factorize(column):
+        return transform(column)
+    try:
+        codes, uniques = factorize(column)
+    except TypeError:
+        # Unhashable values such as lists cannot be factorized
+        return transform(column)
+
+    results = np.empty(len(column), dtype=object)
+    present = codes >= 0
+
+    if len(uniques):
+        # Position of the first occurrence of each code: assigning in reverse order lets it win
+        positions = np.flatnonzero(present)
+        first = np.empty(len(uniques), dtype=np.intp)
+        first[codes[positions[::-1]]] = positions[::-1]
+        distinct_results = transform(column.iloc[first]).to_numpy(dtype=object)
+        results[positions] = distinct_results[codes[positions]]
+
+    missing = np.flatnonzero(~present)
+    if len(missing):
+        if column.dtype == object:
+            results[missing] = transform(column.iloc[missing]).to_numpy(dtype=object)
+        else:
+            results[missing] = transform(column.iloc[missing[:1]]).to_numpy(dtype=object)[0]
+
+    return pd.Series(results, index=column.index, name=column.name).infer_objects()
+
+def map_distinct(column, function, factorize=pd.factorize):
+    """Equivalent of column.apply(function) that calls function once per distinct value."""
+    return transform_distinct(column, lambda values: values.apply(function), factorize)
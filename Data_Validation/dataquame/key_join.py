@@ -0,0 +1,281 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # without pyarrow, datasets are always joined in memory
+    pa = None
+
+# Memory the in-memory hash join may use before the external sort-merge join is used instead
+DEFAULT_JOIN_MEMORY_BYTES = 1024 ** 3
+
+# The hash table of a join takes a few times the memory of the key columns it is built from
+_HASH_TABLE_OVERHEAD = 4
+
+# Rows read back from each spilled run at a time while merging
+MERGE_BATCH_ROWS = 65_536
+
+_ROW = "__dq_row"
+_HASH = "__dq_key_hash"
+_OCCURRENCE = "__dq_occurrence"
+
+def normalize_join_keys(join_keys, df, df2):
+    """Return join_keys as a list of columns and check both datasets have them."""
+    keys = [join_keys] if isinstance(join_keys, str) else list(join_keys)
+    if not keys:
+        raise ValueError("At least one join key column is required.")
+    for key in keys:
+        if key not in df.columns or key not in df2.columns:
+            raise ValueError(f"Join key '{key}' not found in both DataFrames.")
+    return keys
+
+def key_hashes(frame, join_keys):
+    """
+    64-bit hashes of the key values of each row. Numbers are hashed as floats and everything else
+    as text, so keys of the same value hash alike whatever dtype each dataset read them with.
+    """
+    keys = pd.DataFrame({
+        key: frame[key].astype("float64") if pd.api.types.is_numeric_dtype(frame[key]) else frame[key].astype(str)
+        for key in join_keys
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def pair_rows(left, right, join_keys):
+    """
+    Pair the rows of two DataFrames holding the same key values.
+
+    The n-th occurrence of a key on one side is paired with its n-th occurrence on the other, so
+    duplicate keys never multiply rows. Rows with a missing key are never paired.
+
+    Returns:
+        tuple: Positions of the paired rows in left and in right, in the order of left, positions of
+            the rows of left without a partner, and the number of rows of right without one.
+    """
+    def key_frame(frame):
+        keys = frame[join_keys].reset_index(drop=True)
+        complete = keys.notna().all(axis=1).to_numpy()
+        keys = keys[complete]
+        return keys.assign(**{
+            _OCCURRENCE: keys.groupby(join_keys, sort=False, observed=True).cumcount(),
+            _ROW: np.flatnonzero(complete),
+        })
+
+    left_keys = key_frame(left)
+    right_keys = key_frame(right)
+    try:
+        matched = left_keys.merge(right_keys, on=join_keys + [_OCCURRENCE], suffixes=("_left", "_right"))
+    except (TypeError, ValueError):
+        # Keys of incompatible dtypes, such as categoricals with different categories, are matched as text
+        as_text = {key: str for key in join_keys}
+        matched = left_keys.astype(as_text).merge(
+            right_keys.astype(as_text), on=join_keys + [_OCCURRENCE], suffixes=("_left", "_right")
+        )
+    matched = matched.sort_values(f"{_ROW}_left", kind="stable")
+
+    left_positions = matched[f"{_ROW}_left"].to_numpy()
+    right_positions = matched[f"{_ROW}_right"].to_numpy()
+    left_only = np.setdiff1d(np.arange(len(left)), left_positions, assume_unique=True)
+    return left_positions, right_positions, left_only, len(right) - len(right_positions)
+
+class HashJoin:
+    """
+    Aligns two in-memory DataFrames on key columns with a hash join.
+
+    Iterating yields pairs of aligned DataFrames of at most `chunksize` matched rows, followed by
+    the rows of df whose key is missing from df2 paired with None. `counts` holds the number of
+    matched, left-only and right-only rows.
+    """
+
+    method = "hash"
+
+    def __init__(self, df, df2, join_keys, chunksize=None):
+        self.df = df
+        self.df2 = df2
+        self.join_keys = normalize_join_keys(join_keys, df, df2)
+        self.chunksize = chunksize
+        self.counts = None
+
+    def __iter__(self):
+        left_positions, right_positions, left_only, right_only = pair_rows(self.df, self.df2, self.join_keys)
+        self.counts = {"matched": len(left_positions), "left_only": len(left_only), "right_only": right_only}
+
+        step = self.chunksize or max(len(left_positions), 1)
+        for start in range(0, len(left_positions), step):
+            yield (
+                self.df.iloc[left_positions[start:start + step]].reset_index(drop=True),
+                self.df2.iloc[right_positions[start:start + step]].reset_index(drop=True),
+            )
+        if len(left_only):
+            yield self.df.iloc[left_only].reset_index(drop=True), None
+
+class _Run:
+    """Spilled run of rows sorted by key hash, read back a batch at a time."""
+
+    def __init__(self, path, side):
+        self.side = side
+        self._source = pa.memory_map(path)
+        self._reader = pa.ipc.open_file(self._source)
+        self._next_batch = 0
+        self.buffer = None
+
+    @property
+    def exhausted(self):
+        return self._next_batch >= self._reader.num_record_batches
+
+    def read_batch(self):
+        batch = self._reader.get_batch(self._next_batch).to_pandas()
+        self._next_batch += 1
+        self.buffer = batch if self.buffer is None or self.buffer.empty else pd.concat([self.buffer, batch], ignore_index=True)
+
+    def last_hash(self):
+        return self.buffer[_HASH].iloc[-1]
+
+    def take_below(self, frontier):
+        """Remove and return the buffered rows whose hash is below frontier, or all rows when frontier is None."""
+        if frontier is None:
+            taken, self.buffer = self.buffer, None
+            return taken
+        split = int(np.searchsorted(self.buffer[_HASH].to_numpy(), frontier, side="left"))
+        taken, self.buffer = self.buffer.iloc[:split], self.buffer.iloc[split:].reset_index(drop=True)
+        return taken
+
+    def close(self):
+        self._source.close()
+
+class SortMergeJoin:
+    """
+    Aligns two streams of DataFrame chunks on key columns with an external sort-merge join.
+
+    Each chunk is sorted by the hash of its keys and spilled to an Arrow file in spill_dir, then
+    all runs are merged in hash order, a batch at a time. Rows sharing a key are only held together
+    while their hash is merged, so memory stays around the number of runs times MERGE_BATCH_ROWS,
+    however large the datasets are. Pairs are yielded as by HashJoin, left-only rows as they are
+    found, and `counts` is complete once iteration ends.
+    """
+
+    method = "sort-merge"
+
+    def __init__(self, chunks, reference_chunks, join_keys, spill_dir=None, batch_rows=MERGE_BATCH_ROWS):
+        if pa is None:
+            raise ValueError("Joining datasets that do not fit in memory requires pyarrow to be installed.")
+        self.chunks = chunks
+        self.reference_chunks = reference_chunks
+        self.join_keys = [join_keys] if isinstance(join_keys, str) else list(join_keys)
+        self.spill_dir = spill_dir
+        self.batch_rows = batch_rows
+        self.counts = None
+
+    def _spill(self, chunks, side, run_dir):
+        """Write each chunk, sorted by key hash, as a run file and return the run paths."""
+        paths = []
+        row = 0
+        for chunk in chunks:
+            for key in self.join_keys:
+                if key not in chunk.columns:
+                    raise ValueError(f"Join key '{key}' not found in both DataFrames.")
+            if chunk.empty:
+                continue
+            chunk = chunk.reset_index(drop=True)
+            # Global row numbers keep the original order of duplicate keys across runs
+            chunk[_ROW] = np.arange(row, row + len(chunk))
+            chunk[_HASH] = key_hashes(chunk, self.join_keys)
+            row += len(chunk)
+            chunk = chunk.sort_values(_HASH, kind="stable")
+
+            path = os.path.join(run_dir, f"{side}-{len(paths)}.arrow")
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=self.batch_rows)
+            paths.append(path)
+        return paths
+
+    def _join_group(self, rows):
+        """Pair the rows of both sides taken from the runs, which hold every row with their key hashes."""
+        left = [part for side, part in rows if side == "left"]
+        right = [part for side, part in rows if side == "right"]
+        if not left:
+            self.counts["right_only"] += sum(len(part) for part in right)
+            return None
+        left = pd.concat(left, ignore_index=True)
+        right = pd.concat(right, ignore_index=True) if right else left.iloc[:0]
+        left = left.sort_values(_ROW, kind="stable").reset_index(drop=True)
+        right = right.sort_values(_ROW, kind="stable").reset_index(drop=True)
+
+        left_positions, right_positions, left_only, right_only = pair_rows(left, right, self.join_keys)
+        self.counts["matched"] += len(left_positions)
+        self.counts["left_only"] += len(left_only)
+        self.counts["right_only"] += right_only
+        helper_columns = [_ROW, _HASH]
+        return (
+            left.iloc[left_positions].drop(columns=helper_columns).reset_index(drop=True),
+            right.iloc[right_positions].drop(columns=helper_columns).reset_index(drop=True),
+            left.iloc[left_only].drop(columns=helper_columns).reset_index(drop=True),
+        )
+
+    def __iter__(self):
+        self.counts = {"matched": 0, "left_only": 0, "right_only": 0}
+        run_dir = tempfile.mkdtemp(prefix="dq_join_", dir=self.spill_dir)
+        runs = []
+        try:
+            runs = [_Run(path, "left") for path in self._spill(self.chunks, "left", run_dir)]
+            runs += [_Run(path, "right") for path in self._spill(self.reference_chunks, "right", run_dir)]
+
+            while True:
+                for run in runs:
+                    if (run.buffer is None or run.buffer.empty) and not run.exhausted:
+                        run.read_batch()
+                active = [run for run in runs if run.buffer is not None and not run.buffer.empty]
+                if not active:
+                    break
+
+                # Rows hashed below the smallest last buffered hash of the runs with more to read are
+                # complete: no later batch of any run can hold the same key
+                unread = [run.last_hash() for run in active if not run.exhausted]
+                frontier = min(unread) if unread else None
+                rows = [(run.side, run.take_below(frontier)) for run in active]
+                rows = [(side, part) for side, part in rows if part is not None and not part.empty]
+                if not rows:
+                    # The runs ending on the frontier hash may continue it, read further into them
+                    for run in active:
+                        if not run.exhausted and run.last_hash() == frontier:
+                            run.read_batch()
+                    continue
+
+                joined = self._join_group(rows)
+                if joined is None:
+                    continue
+                left, right, left_only = joined
+                if len(left):
+                    yield left, right
+                if len(left_only):
+                    yield left_only, None
+        finally:
+            for run in runs:
+                run.close()
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+def _frame_chunks(df, chunksize):
+    step = chunksize or max(len(df), 1)
+    for start in range(0, len(df), step):
+        yield df.iloc[start:start + step]
+
+def align_on_keys(df, df2, join_keys, chunksize=None, memory_limit=DEFAULT_JOIN_MEMORY_BYTES, spill_dir=None):
+    """
+    Align two DataFrames on key columns, with a hash join when its hash table fits in memory_limit
+    and an external sort-merge join otherwise.
+
+    Returns:
+        HashJoin or SortMergeJoin: Iterable of aligned pairs, see HashJoin.
+    """
+    join_keys = normalize_join_keys(join_keys, df, df2)
+    key_bytes = df[join_keys].memory_usage(deep=True).sum() + df2[join_keys].memory_usage(deep=True).sum()
+    if pa is None or key_bytes * _HASH_TABLE_OVERHEAD <= memory_limit:
+        return HashJoin(df, df2, join_keys, chunksize)
+    return SortMergeJoin(
+        _frame_chunks(df, chunksize or MERGE_BATCH_ROWS), _frame_chunks(df2, chunksize or MERGE_BATCH_ROWS),
+        join_keys, spill_dir,
+    )
@@ -0,0 +1,576 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.factorized import map_distinct
+from Data_Validation.dataquame.sampling import CONFIDENCE_LEVEL, RowReservoir, StratifiedReservoir, wilson_interval
+from Data_Validation.dataquame.sketches import HyperLogLog, KLLSketch, kll_rank_error
+from Data_Validation.dataquame.validators import ColumnValidator
+
+# Order of the metrics in the scores DataFrame returned by calculate_scores
+METRICS = ["Completeness", "Timeliness", "Validity", "Accuracy", "Uniqueness", "Consistency", "Reliability"]
+
+# Size of the quantile sketches Reliability takes its outlier fences from, also the number of
+# values up to which they are exact
+QUANTILE_SKETCH_K = 200
+
+# Seed of the quantile sketches' compactors, so the same values always get the same Reliability
+QUANTILE_SKETCH_SEED = 0
+
+# Metrics that are a share of rows and can be estimated from a sample of the rows
+SAMPLED_METRICS = ["Completeness", "Timeliness", "Validity", "Accuracy", "Consistency"]
+
+# Metrics whose update() can take the null masks and factorized codes of an AnalysisContext
+# instead of computing them, when the column fed is a whole column of the context's DataFrame
+CONTEXT_METRICS = ["Completeness", "Validity", "Uniqueness"]
+
+def values_equal(left, right):
+    """Compare two positionally aligned Series element-wise, treating NaN as equal to NaN."""
+    left = left.reset_index(drop=True)
+    right = right.reset_index(drop=True)
+    try:
+        equal = left == right
+    except TypeError:
+        # Mismatched categoricals and similar cases fall back to plain object comparison
+        equal = pd.Series(left.to_numpy(dtype=object) == right.to_numpy(dtype=object))
+    both_missing = left.isna().to_numpy() & right.isna().to_numpy()
+    return equal.fillna(False).to_numpy(dtype=bool) | both_missing
+
+def sketched_reliability(df):
+    """
+    Whether the Reliability of any column of df is estimated, its quantile sketch holding more
+    values than it keeps exactly.
+    """
+    return any(
+        pd.api.types.is_numeric_dtype(df[col]) and df[col].count() > QUANTILE_SKETCH_K for col in df.columns
+    )
+
+def default_validation_function(column):
+    """Pick the validation function validity_score uses when none is given."""
+    if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_datetime64_any_dtype(column):
+        return lambda x: not pd.isna(x)
+    return lambda x: isinstance(x, str) and x.strip() != ""
+
+# Every accumulator follows the same protocol:
+#   update(...)    folds one chunk of a column into the running state
+#   merge(other)   combines the state of an accumulator fed with other chunks
+#   finalize()     returns the score as a percentage
+# update and merge return self so calls can be chained. Metrics that are a share of rows also
+# have counts(), returning the rows that passed and the rows checked, used to estimate them from samples.
+
+class CompletenessAccumulator:
+    """Counts rows and missing cells of a column."""
+
+    def __init__(self):
+        self.total = 0
+        self.missing = 0
+
+    def update(self, column, context=None):
+        self.total += len(column)
+        self.missing += context.null_count(column.name) if context is not None else int(column.isnull().sum())
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.missing += other.missing
+        return self
+
+    def counts(self):
+        return self.total - self.missing, self.total
+
+    def finalize(self):
+        if self.total == 0:
+            return 0.0  # Return 0% if the column is empty
+        return (self.total - self.missing) / self.total * 100
+
+class UniquenessAccumulator:
+    """Keeps the distinct non-null values of a column seen so far."""
+
+    def __init__(self):
+        self.total = 0
+        self.distinct = pd.Series(dtype=object)
+
+    def _add_distinct(self, values):
+        if len(self.distinct) == 0:
+            self.distinct = values
+        elif len(values):
+            combined = pd.concat([self.distinct, values], ignore_index=True)
+            self.distinct = pd.Series(combined.unique())
+
+    def update(self, column, context=None):
+        self.total += len(column)
+        if context is not None:
+            self._add_distinct(context.distinct_values(column.name))
+        else:
+            self._add_distinct(pd.Series(column.dropna().unique()))
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self._add_distinct(other.distinct)
+        return self
+
+    def finalize(self):
+        if self.total == 0:
+            return 0.0  # Return 0% if the column is empty
+        return len(self.distinct) / self.total * 100
+
+class ApproximateUniquenessAccumulator:
+    """Estimates the distinct non-null values of a column with a HyperLogLog sketch."""
+
+    def __init__(self, error=0.01):
+        self.total = 0
+        self.sketch = HyperLogLog(error)
+
+    def update(self, column, context=None):
+        # The context is not used, its distinct values are the exact set the sketch stands in for
+        self.total += len(column)
+        self.sketch.update(column)
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+        return self
+
+    def finalize(self):
+        if self.total == 0:
+            return 0.0  # Return 0% if the column is empty
+        # The estimate can overshoot on nearly unique columns
+        return min(self.sketch.count(), self.total) / self.total * 100
+
+class ValidityAccumulator:
+    """Counts entries accepted by a validation function or a registered column validator."""
+
+    def __init__(self, validation_function=None):
+        self.validation_function = validation_function
+        self.total = 0
+        self.valid = 0
+
+    def update(self, column, context=None):
+        self.total += len(column)
+        if isinstance(self.validation_function, ColumnValidator):
+            # Registered validators check the whole column at once
+            self.valid += int(self.validation_function(column).sum())
+            return self
+
+        # Per-value functions run once per distinct value rather than once per row
+        validation_function = self.validation_function or default_validation_function(column)
+        if context is not None:
+            valid = map_distinct(column, validation_function, lambda _: context.codes(column.name))
+        else:
+            valid = map_distinct(column, validation_function)
+        self.valid += int(valid.sum())
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.valid += other.valid
+        return self
+
+    def counts(self):
+        return self.valid, self.total
+
+    def finalize(self):
+        if self.total == 0:
+            return 0.0  # Return 0% if the column is empty
+        return self.valid / self.total * 100
+
+class TimelinessAccumulator:
+    """Counts datetime entries on or after a threshold date."""
+
+    def __init__(self, threshold_date):
+        if threshold_date is None:
+            raise ValueError("Threshold date must be provided and cannot be None.")
+        self.threshold_date = pd.to_datetime(threshold_date).tz_localize(None)
+        self.total = 0
+        self.timely = 0
+        self.is_datetime = True
+
+    def update(self, column):
+        if not pd.api.types.is_datetime64_any_dtype(column):
+            self.is_datetime = False
+            return self
+        self.total += len(column)
+        self.timely += int((column >= self.threshold_date).sum())
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.timely += other.timely
+        self.is_datetime = self.is_datetime and other.is_datetime
+        return self
+
+    def counts(self):
+        return (self.timely, self.total) if self.is_datetime else None
+
+    def finalize(self):
+        if not self.is_datetime:
+            return 100.0  # If not a datetime column, assume 100% timeliness
+        if self.total == 0:
+            return 0.0  # Return 0% if the column is empty
+        return self.timely / self.total * 100
+
+class AccuracyAccumulator:
+    """Counts entries matching the reference column, within a threshold for numbers."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold
+        self.correct = 0
+        self.valid = 0
+
+    def update(self, column, reference_column):
+        # Handling the case where we compare numeric values with a threshold
+        if pd.api.types.is_numeric_dtype(column) and self.threshold is not None:
+            # Differences are taken in float64 so downcast integer columns cannot overflow
+            correct_entries = (abs(column.astype("float64") - reference_column.astype("float64")) <= self.threshold).sum()
+        else:
+            # Compare string or categorical columns directly (ignoring NaN comparisons)
+            try:
+                correct_entries = (column == reference_column).sum()
+            except TypeError:
+                # Categoricals with different categories are compared by value
+                correct_entries = (column.astype(object) == reference_column.astype(object)).sum()
+
+        self.correct += int(correct_entries)
+        self.valid += int(column.notna().sum())
+        return self
+
+    def merge(self, other):
+        self.correct += other.correct
+        self.valid += other.valid
+        return self
+
+    def counts(self):
+        return self.correct, self.valid
+
+    def finalize(self):
+        return (self.correct / self.valid) * 100 if self.valid > 0 else 100
+
+class ConsistencyAccumulator:
+    """Counts positions where a column agrees with its reference, NaN matching NaN."""
+
+    def __init__(self):
+        self.total = 0
+        self.consistent = 0
+
+    def update(self, column, reference_column):
+        if len(reference_column) != len(column):
+            raise ValueError("Column and reference column chunks must have the same number of rows.")
+        self.total += len(column)
+        self.consistent += int(values_equal(column, reference_column).sum())
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.consistent += other.consistent
+        return self
+
+    def counts(self):
+        return self.consistent, self.total
+
+    def finalize(self):
+        return (self.consistent / self.total) * 100 if self.total > 0 else 100
+
+class ReliabilityAccumulator:
+    """
+    Counts entries of a numeric column within the 1.5 IQR outlier fences.
+
+    With exact=True the values are kept and the fences come from their exact quartiles, for
+    columns scored in memory. Otherwise the quartiles and the count within the fences come from a
+    KLL quantile sketch, so chunks can be merged in bounded memory. Once the sketch compacts, the
+    score is off by at most about twice its rank error. Missing values count as unreliable.
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, exact=False):
+        self.total = 0
+        self.exact = exact
+        self.values = []
+        self.sketch = KLLSketch(k, seed=QUANTILE_SKETCH_SEED)
+        self.is_numeric = True
+
+    @property
+    def is_exact(self):
+        return self.exact or self.sketch.is_exact
+
+    def update(self, column):
+        if not pd.api.types.is_numeric_dtype(column):
+            self.is_numeric = False
+            return self
+        self.total += len(column)
+        if self.exact:
+            values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            self.values.append(values[~np.isnan(values)])
+        else:
+            self.sketch.update(column)
+        return self
+
+    def merge(self, other):
+        if other.exact != self.exact:
+            raise ValueError("Exact and sketched Reliability accumulators cannot be merged.")
+        self.total += other.total
+        self.values.extend(other.values)
+        self.sketch.merge(other.sketch)
+        self.is_numeric = self.is_numeric and other.is_numeric
+        return self
+
+    def _fenced_count(self):
+        """Number of values within the 1.5 IQR fences, None if there are no values."""
+        if self.exact:
+            values = np.concatenate(self.values) if self.values else np.empty(0)
+            if len(values) == 0:
+                return None
+            q1, q3 = np.quantile(values, [0.25, 0.75])
+            iqr = q3 - q1
+            return int(np.count_nonzero((values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)))
+        if self.sketch.count == 0:
+            return None
+        q1 = self.sketch.quantile(0.25)
+        q3 = self.sketch.quantile(0.75)
+        iqr = q3 - q1
+        return self.sketch.count_between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+
+    def finalize(self):
+        if not self.is_numeric:
+            return 100.0  # Return 100% reliability if the column is not numerical
+        reliable = self._fenced_count() if self.total else None
+        if reliable is None:
+            return 0.0  # Return 0% if the column is empty
+        return reliable / self.total * 100
+
+class ColumnAccumulator:
+    """
+    Accumulates every quality metric of one column against its reference column.
+
+    Validity is only checked when a validation function is given and reported as 100% otherwise,
+    matching calculate_scores. When distinct_error is given, Uniqueness is estimated with a
+    HyperLogLog sketch of that relative standard error instead of counted exactly. Reliability
+    takes exact quartiles when exact_reliability is set, for columns held in memory whole.
+    """
+
+    def __init__(self, threshold_date, validation_function=None, accuracy_threshold=None, distinct_error=None,
+                 exact_reliability=False):
+        if distinct_error is None:
+            uniqueness = UniquenessAccumulator()
+        else:
+            uniqueness = ApproximateUniquenessAccumulator(distinct_error)
+
+        self.metrics = {
+            "Completeness": CompletenessAccumulator(),
+            "Timeliness": TimelinessAccumulator(threshold_date),
+            "Validity": ValidityAccumulator(validation_function) if validation_function else None,
+            "Accuracy": AccuracyAccumulator(accuracy_threshold),
+            "Uniqueness": uniqueness,
+            "Consistency": ConsistencyAccumulator(),
+            "Reliability": ReliabilityAccumulator(exact=exact_reliability),
+        }
+
+    def update(self, column, reference_column=None, context=None):
+        """
+        Fold in a chunk of the column, only into its own metrics for rows missing from the reference.
+        When the chunk is the whole column of an AnalysisContext's DataFrame, pass the context to
+        reuse its intermediates.
+        """
+        for name, accumulator in self.metrics.items():
+            if accumulator is None:
+                continue
+            if name in ("Accuracy", "Consistency"):
+                if reference_column is not None:
+                    accumulator.update(column, reference_column)
+            elif name in CONTEXT_METRICS and context is not None:
+                accumulator.update(column, context)
+            else:
+                accumulator.update(column)
+        return self
+
+    def merge(self, other):
+        for name, accumulator in self.metrics.items():
+            if accumulator is not None:
+                accumulator.merge(other.metrics[name])
+        return self
+
+    def finalize(self):
+        return {
+            name: accumulator.finalize() if accumulator is not None else 100
+            for name, accumulator in self.metrics.items()
+        }
+
+class ScoreAccumulator:
+    """
+    Accumulates the quality metrics of every column of a dataset, chunk by chunk.
+
+    Chunks of the dataset and of its reference must cover the same rows with the same index,
+    and may be fed in any order or to separate accumulators that are merged afterwards. Rows of
+    the dataset that have no counterpart in the reference are fed without a reference chunk.
+    Reliability keeps every value for exact quartiles when exact_reliability is set, which only
+    suits datasets already held in memory.
+    """
+
+    def __init__(self, columns, threshold_date=None, validation_functions=None, accuracy_threshold=None,
+                 distinct_error=None, exact_reliability=False):
+        if threshold_date is None:
+            threshold_date = pd.Timestamp.today().normalize()
+        validation_functions = validation_functions or {}
+
+        self.columns = list(columns)
+        self.distinct_error = distinct_error
+        self.accumulators = {
+            col: ColumnAccumulator(
+                threshold_date, validation_functions.get(col), accuracy_threshold, distinct_error, exact_reliability
+            )
+            for col in self.columns
+        }
+
+    def update(self, chunk, reference_chunk=None, context=None):
+        """Fold in a chunk, see ColumnAccumulator.update for the context, whose DataFrame must be the chunk."""
+        if context is not None and context.df is not chunk:
+            raise ValueError("An analysis context can only be used with the DataFrame it was built for.")
+        for col in self.columns:
+            if reference_chunk is None:
+                self.accumulators[col].update(chunk[col], context=context)
+                continue
+            if col not in reference_chunk.columns:
+                raise ValueError(f"Column '{col}' not found in both DataFrames.")
+            self.accumulators[col].update(chunk[col], reference_chunk[col], context)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Only accumulators built for the same columns can be merged.")
+        for col in self.columns:
+            self.accumulators[col].merge(other.accumulators[col])
+        return self
+
+    def finalize(self):
+        detailed_scores = {col: self.accumulators[col].finalize() for col in self.columns}
+        scores_df = pd.DataFrame(detailed_scores, index=METRICS).T
+        # Metrics that were estimated rather than computed exactly, shown as such in the reports
+        scores_df.attrs["approximate"] = ["Uniqueness"] if self.distinct_error is not None else []
+        if any(not self.accumulators[col].metrics["Reliability"].is_exact for col in self.columns):
+            scores_df.attrs["approximate"].append("Reliability")
+        scores_df.attrs["distinct_error"] = self.distinct_error
+        scores_df.attrs["quantile_rank_error"] = kll_rank_error(QUANTILE_SKETCH_K)
+        return scores_df
+
+class SampledScoreAccumulator:
+    """
+    Estimates the quality metrics of every column from a sample of rows drawn in one pass.
+
+    Rows are sampled uniformly, or within each value of the `stratify_by` column, keeping at most
+    `sample_size` rows (per stratum). The metrics in SAMPLED_METRICS are estimated from the sample,
+    strata weighted by their share of all rows, with a 95% Wilson confidence interval. Uniqueness
+    and Reliability cannot be estimated from a sample and are still computed over every row, with
+    a HyperLogLog sketch when distinct_error is given, and a quantile sketch unless
+    exact_reliability is set.
+    """
+
+    def __init__(self, columns, sample_size, threshold_date=None, validation_functions=None, accuracy_threshold=None,
+                 distinct_error=None, stratify_by=None, seed=None, exact_reliability=False):
+        if threshold_date is None:
+            threshold_date = pd.Timestamp.today().normalize()
+
+        self.columns = list(columns)
+        self.threshold_date = threshold_date
+        self.validation_functions = validation_functions or {}
+        self.accuracy_threshold = accuracy_threshold
+        self.distinct_error = distinct_error
+        self.stratify_by = stratify_by
+        if stratify_by is None:
+            self.reservoir = RowReservoir(sample_size, seed)
+        else:
+            self.reservoir = StratifiedReservoir(stratify_by, sample_size, seed)
+        self.uniqueness = {
+            col: UniquenessAccumulator() if distinct_error is None else ApproximateUniquenessAccumulator(distinct_error)
+            for col in self.columns
+        }
+        self.reliability = {col: ReliabilityAccumulator(exact=exact_reliability) for col in self.columns}
+
+    def update(self, chunk, reference_chunk):
+        for col in self.columns:
+            if col not in reference_chunk.columns:
+                raise ValueError(f"Column '{col}' not found in both DataFrames.")
+            self.uniqueness[col].update(chunk[col])
+            self.reliability[col].update(chunk[col])
+        self.reservoir.update(chunk, reference_chunk)
+        return self
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Only accumulators built for the same columns can be merged.")
+        for col in self.columns:
+            self.uniqueness[col].merge(other.uniqueness[col])
+            self.reliability[col].merge(other.reliability[col])
+        self.reservoir.merge(other.reservoir)
+        return self
+
+    def _strata(self):
+        reservoirs = [self.reservoir] if self.stratify_by is None else self.reservoir.strata.values()
+        return [reservoir for reservoir in reservoirs if reservoir.sample is not None and len(reservoir.sample)]
+
+    def _estimate(self, counts, sampled_rows):
+        """
+        Combine (weight, passed, checked) counts of the strata into a score and its interval.
+        Each stratum's rows stand for weight rows of the dataset, and the interval is taken over
+        the effective sample size of the weighted sample, narrowed as the sample nears every row.
+        """
+        passed = sum(weight * hits for weight, hits, _ in counts)
+        checked = sum(weight * trials for weight, _, trials in counts)
+        if checked == 0:
+            return None, None
+        score = passed / checked
+        if sampled_rows >= self.reservoir.rows_seen:
+            return score * 100, (score * 100, score * 100)  # Every row was sampled, the score is exact
+        effective_trials = checked ** 2 / sum(weight ** 2 * trials for weight, _, trials in counts)
+        effective_trials /= 1 - sampled_rows / self.reservoir.rows_seen
+        return score * 100, wilson_interval(score, effective_trials)
+
+    def finalize(self):
+        strata = self._strata()
+        sampled_rows = sum(len(reservoir.sample) for reservoir in strata)
+        detailed_scores = {}
+        intervals = {}
+        for col in self.columns:
+            validation_function = self.validation_functions.get(col)
+            counts = {metric: [] for metric in SAMPLED_METRICS}
+            for reservoir in strata:
+                accumulator = ColumnAccumulator(self.threshold_date, validation_function, self.accuracy_threshold)
+                accumulator.metrics["Uniqueness"] = None
+                accumulator.metrics["Reliability"] = None
+                accumulator.update(reservoir.sample[col], reservoir.reference_sample[col])
+                weight = reservoir.rows_seen / len(reservoir.sample)
+                for metric in SAMPLED_METRICS:
+                    metric_accumulator = accumulator.metrics[metric]
+                    if metric_accumulator is not None and metric_accumulator.counts() is not None:
+                        counts[metric].append((weight, *metric_accumulator.counts()))
+
+            # Metrics that cannot be checked, such as Timeliness of text, get the scores calculate_scores
+            # gives an empty column of the same dtype, those of a column of no rows when nothing was sampled
+            defaults = ColumnAccumulator(self.threshold_date, validation_function, self.accuracy_threshold)
+            if strata:
+                defaults.update(strata[0].sample[col].iloc[:0], strata[0].reference_sample[col].iloc[:0])
+            scores = defaults.finalize()
+            intervals[col] = {}
+            for metric in SAMPLED_METRICS:
+                score, interval = self._estimate(counts[metric], sampled_rows)
+                if score is not None:
+                    scores[metric] = score
+                    intervals[col][metric] = interval
+            scores["Uniqueness"] = self.uniqueness[col].finalize()
+            scores["Reliability"] = self.reliability[col].finalize()
+            detailed_scores[col] = scores
+
+        scores_df = pd.DataFrame(detailed_scores, index=METRICS).T
+        scores_df.attrs["approximate"] = SAMPLED_METRICS + (["Uniqueness"] if self.distinct_error is not None else [])
+        if any(not accumulator.is_exact for accumulator in self.reliability.values()):
+            scores_df.attrs["approximate"].append("Reliability")
+        scores_df.attrs["distinct_error"] = self.distinct_error
+        scores_df.attrs["quantile_rank_error"] = kll_rank_error(QUANTILE_SKETCH_K)
+        scores_df.attrs["confidence_intervals"] = intervals
+        scores_df.attrs["sample"] = {
+            "method": "uniform" if self.stratify_by is None else "stratified",
+            "stratify_by": self.stratify_by,
+            "strata": len(strata),
+            "rows": sampled_rows,
+            "total_rows": self.reservoir.rows_seen,
+            "confidence": CONFIDENCE_LEVEL,
+        }
+        return scores_df
@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Confidence level of the intervals reported with sampled scores, and its two-sided z value
+CONFIDENCE_LEVEL = 0.95
+CONFIDENCE_Z = 1.959963984540054
+
+# Strata a stratified sample may have, each keeps a reservoir of its own
+MAX_STRATA = 100
+
+def wilson_interval(proportion, trials, z=CONFIDENCE_Z):
+    """
+    Wilson score interval of a proportion observed over `trials` draws, as percentages.
+    Unlike the normal approximation it stays within 0-100% and is usable for scores near 100%.
+    """
+    if trials <= 0:
+        return None
+    denominator = 1 + z * z / trials
+    center = (proportion + z * z / (2 * trials)) / denominator
+    half_width = z / denominator * math.sqrt(proportion * (1 - proportion) / trials + z * z / (4 * trials * trials))
+    # At 0% and 100% the interval ends exactly at the observed score, rounding errors aside
+    low = 0.0 if proportion <= 0 else max(center - half_width, 0.0)
+    high = 1.0 if proportion >= 1 else min(center + half_width, 1.0)
+    return low * 100, high * 100
+
+class RowReservoir:
+    """
+    Uniform sample of at most `size` aligned rows of a dataset and its reference, drawn in one pass.
+
+    Every row gets a random key and the rows with the smallest keys are kept (bottom-k sampling),
+    so chunks can be fed in any order and reservoirs fed with separate chunks can be merged.
+    """
+
+    def __init__(self, size, seed=None):
+        if size is None or size <= 0:
+            raise ValueError("The sample size must be a positive number of rows.")
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.rows_seen = 0
+        self.keys = np.empty(0)
+        self.sample = None
+        self.reference_sample = None
+
+    def update(self, chunk, reference_chunk):
+        if len(reference_chunk) != len(chunk):
+            raise ValueError("Chunks of the dataset and its reference must have the same number of rows.")
+        self.rows_seen += len(chunk)
+        self._add(self.rng.random(len(chunk)), chunk.reset_index(drop=True), reference_chunk.reset_index(drop=True))
+        return self
+
+    def merge(self, other):
+        self.rows_seen += other.rows_seen
+        if other.sample is not None:
+            self._add(other.keys, other.sample, other.reference_sample)
+        return self
+
+    def _add(self, keys, rows, reference_rows):
+        if self.sample is not None and len(self.keys) >= self.size:
+            # Only rows whose keys beat the largest kept key can enter a full reservoir
+            candidates = np.flatnonzero(keys < self.keys.max())
+            keys, rows, reference_rows = keys[candidates], rows.iloc[candidates], reference_rows.iloc[candidates]
+        if self.sample is not None:
+            keys = np.concatenate([self.keys, keys])
+            rows = pd.concat([self.sample, rows], ignore_index=True)
+            reference_rows = pd.concat([self.reference_sample, reference_rows], ignore_index=True)
+        if len(keys) > self.size:
+            kept = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            keys, rows, reference_rows = keys[kept], rows.iloc[kept], reference_rows.iloc[kept]
+        self.keys = keys
+        self.sample = rows.reset_index(drop=True)
+        self.reference_sample = reference_rows.reset_index(drop=True)
+
+class StratifiedReservoir:
+    """
+    Sample of aligned rows drawn separately within each value of the `by` column, so that rare
+    groups are represented even when they are a tiny share of the rows. Each stratum keeps up to
+    `size` rows, and its share of all rows is counted to weight it when scores are estimated.
+    """
+
+    def __init__(self, by, size, seed=None):
+        if size is None or size <= 0:
+            raise ValueError("The sample size must be a positive number of rows.")
+        self.by = by
+        self.size = size
+        self.seed = np.random.SeedSequence(seed)
+        self.rows_seen = 0
+        self.strata = {}
+
+    def _stratum(self, value):
+        if value not in self.strata:
+            if len(self.strata) >= MAX_STRATA:
+                raise ValueError(
+                    f"Column '{self.by}' has more than {MAX_STRATA} distinct values, stratify by a coarser column."
+                )
+            self.strata[value] = RowReservoir(self.size, self.seed.spawn(1)[0])
+        return self.strata[value]
+
+    def update(self, chunk, reference_chunk):
+        if self.by not in chunk.columns:
+            raise ValueError(f"Column '{self.by}' to stratify by was not found in the dataset.")
+        self.rows_seen += len(chunk)
+        # Missing values form a stratum of their own
+        for value, positions in chunk.groupby(self.by, dropna=False, observed=True, sort=False).indices.items():
+            value = None if pd.isna(value) else value
+            self._stratum(value).update(chunk.iloc[positions], reference_chunk.iloc[positions])
+        return self
+
+    def merge(self, other):
+        self.rows_seen += other.rows_seen
+        for value, reservoir in other.strata.items():
+            self._stratum(value).merge(reservoir)
+        return self
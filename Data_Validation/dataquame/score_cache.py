@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Bound on the number of memoized column results kept by default
+DEFAULT_MAX_ENTRIES = 10_000
+
+def column_fingerprint(column):
+    """
+    Fingerprint a column's values, dtype and index with a vectorized 64-bit row hash.
+
+    Two columns with the same fingerprint score identically against the same reference.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(column.dtype).encode("utf-8"))
+    digest.update(len(column).to_bytes(8, "little"))
+    try:
+        row_hashes = pd.util.hash_pandas_object(column, index=True)
+    except TypeError:
+        # Unhashable values such as lists are fingerprinted through their text form
+        row_hashes = pd.util.hash_pandas_object(column.astype(str), index=True)
+    digest.update(row_hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+class ScoreCache:
+    """
+    Bounded LRU memo of per-column scores, safe to share between threads.
+
+    Entries are keyed by the fingerprints of a column and its reference column plus the metric
+    configuration, so re-scoring a feed only recomputes the columns that changed.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(column, reference_column, threshold_date, validator=None, distinct_error=None, accuracy_threshold=None,
+                 exact_reliability=True):
+        # The threshold date only changes the scores of datetime columns
+        if not pd.api.types.is_datetime64_any_dtype(column):
+            threshold_date = None
+        return (
+            column_fingerprint(column),
+            column_fingerprint(reference_column),
+            threshold_date,
+            validator,
+            distinct_error,
+            accuracy_threshold,
+            exact_reliability,
+        )
+
+    def get(self, key):
+        """Return the memoized scores for key, or None on a miss."""
+        with self._lock:
+            scores = self._entries.get(key)
+            if scores is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(scores)
+
+    def put(self, key, scores):
+        with self._lock:
+            self._entries[key] = dict(scores)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+def hash_values(column):
+    """
+    Hash the non-null values of a column to 64-bit integers.
+
+    Numbers are hashed as floats so 1 and 1.0 collide, as they do for nunique(), and so do
+    0.0 and -0.0 once adding 0.0 has turned -0.0 into 0.0.
+    """
+    values = column.dropna()
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        values = values.astype("float64") + 0.0
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for uint64 arrays holding values below 2**53."""
+    # Below 2**53 the conversion to float is exact, and the float exponent is the bit length
+    as_float = values.view(np.int64).astype(np.float64)
+    exponent = (as_float.view(np.int64) >> 52) - 1022
+    return np.where(values > 0, exponent, 0)
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch.
+
+    The number of registers is chosen so that the relative standard error of the estimate
+    is at most `error` (1.04 / sqrt(registers)), between 2**11 and 2**18 registers.
+    Memory is one byte per register, regardless of how many values are added.
+    """
+
+    def __init__(self, error=0.01):
+        if not 0 < error < 1:
+            raise ValueError("error must be between 0 and 1.")
+        self.precision = min(max(math.ceil(math.log2((1.04 / error) ** 2)), 11), 18)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @property
+    def error(self):
+        """Relative standard error of the estimate."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, column):
+        self.add_hashes(hash_values(column))
+        return self
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return self
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        remaining_bits = 64 - self.precision
+        index = (hashes >> np.uint64(remaining_bits)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << remaining_bits) - 1)
+        # Position of the leftmost 1-bit in the remaining bits, counted from 1
+        rank = (remaining_bits - _bit_length(remainder) + 1).astype(np.uint8)
+
+        # Unbuffered, so every hash landing on the same register is taken into account
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Only sketches with the same error bound can be merged.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+def kll_rank_error(k):
+    """Normalized rank error of a KLL sketch of size k, the empirical bound at 99% confidence."""
+    return 2.446 / k ** 0.9433
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch (KLL) of the numeric values of a column.
+
+    Values are kept in a stack of compactors, those at level h standing for 2**h values each.
+    A full compactor sorts its values and promotes every other one, from a random offset, to the
+    next level. Memory is O(k) values however many are added, and quantiles and rank counts are
+    off by at most about `rank_error` of all values. Until more than k values were added nothing
+    is compacted and results are exact.
+    """
+
+    def __init__(self, k=200, seed=None):
+        if k < 8:
+            raise ValueError("k must be at least 8.")
+        self.k = k
+        self.count = 0
+        self.compactors = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        return kll_rank_error(self.k)
+
+    @property
+    def is_exact(self):
+        return len(self.compactors) == 1
+
+    def _capacity(self, level):
+        # Lower levels get geometrically smaller capacities than the top one
+        depth = len(self.compactors) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, column):
+        values = pd.to_numeric(column, errors="coerce")
+        self.add_values(values.to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def add_values(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        if other.k != self.k:
+            raise ValueError("Only sketches with the same k can be merged.")
+        self.count += other.count
+        for level, items in enumerate(other.compactors):
+            if level == len(self.compactors):
+                self.compactors.append(np.empty(0))
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays at this level, the others are paired up and half of them promoted
+                kept, paired = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = paired[self.rng.integers(2)::2]
+                self.compactors[level] = kept
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+            level += 1
+
+    def _sorted_items(self):
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(c), 2 ** level, dtype=np.int64) for level, c in enumerate(self.compactors)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """Value at quantile q, interpolated as pandas does while the sketch is exact."""
+        if self.count == 0:
+            return np.nan
+        if self.is_exact:
+            return float(np.quantile(self.compactors[0], q))
+        items, weights = self._sorted_items()
+        position = np.searchsorted(np.cumsum(weights), q * self.count, side="left")
+        return float(items[min(position, len(items) - 1)])
+
+    def count_between(self, low, high):
+        """Estimated number of values added that lie between low and high, both included."""
+        items, weights = self._sorted_items()
+        return int(weights[(items >= low) & (items <= high)].sum())
@@ -0,0 +1,143 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  Arrow strings run regular expressions natively
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+EMAIL_PATTERN = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+PHONE_PATTERN = r"^\+?(?:[\s().-]*\d){7,15}[\s().-]*$"
+ISO_DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?$"
+
+# Built-in and user-registered validators by name. Each one takes a whole column and returns
+# a boolean NumPy array marking the valid entries.
+VALIDATORS = {}
+
+def register_validator(name):
+    """Decorator registering a column validator under name."""
+    def decorator(function):
+        VALIDATORS[name] = function
+        return function
+    return decorator
+
+def as_text(column):
+    """Convert a column to a string column suited to vectorized matching, keeping nulls as missing."""
+    return column.astype(STRING_DTYPE)
+
+def matches(column, pattern):
+    """Vectorized re.match(pattern, str(value)) over a column, missing values never match."""
+    text = as_text(column)
+    try:
+        matched = text.str.match(pattern)
+    except (ValueError, NotImplementedError):
+        # Arrow's RE2 engine rejects some patterns Python's re accepts, such as lookarounds and
+        # backreferences. Those are matched value by value with re instead.
+        matched = text.astype(object).str.match(pattern).astype("boolean")
+    return matched.fillna(False).to_numpy(dtype=bool)
+
+@register_validator("email")
+def email_validator(column):
+    """Entries that look like an email address."""
+    return matches(column, EMAIL_PATTERN)
+
+@register_validator("phone")
+def phone_validator(column):
+    """Entries made of 7 to 15 digits, with an optional leading + and common separators."""
+    return matches(column, PHONE_PATTERN)
+
+@register_validator("iso_date")
+def iso_date_validator(column):
+    """Entries that are dates, or ISO 8601 date strings naming a real calendar date."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column.notna().to_numpy()
+    well_formed = matches(column, ISO_DATE_PATTERN)
+    parsed = pd.to_datetime(as_text(column).where(well_formed), format="ISO8601", errors="coerce", utc=True)
+    return well_formed & parsed.notna().to_numpy()
+
+@register_validator("range")
+def range_validator(column, min=None, max=None):
+    """Numeric entries between min and max, both inclusive and both optional."""
+    values = pd.to_numeric(column, errors="coerce")
+    valid = values.notna().to_numpy()
+    if min is not None:
+        valid &= (values >= min).fillna(False).to_numpy(dtype=bool)
+    if max is not None:
+        valid &= (values <= max).fillna(False).to_numpy(dtype=bool)
+    return valid
+
+@register_validator("enum")
+def enum_validator(column, values):
+    """Entries belonging to a fixed set of allowed values."""
+    return column.isin(list(values)).to_numpy()
+
+@register_validator("regex")
+def regex_validator(column, pattern):
+    """Entries matching a regular expression from their start, like re.match."""
+    return matches(column, pattern)
+
+class ColumnValidator:
+    """
+    A registered validator bound to its parameters.
+
+    Only the validator name and parameters are stored, so instances can be sent to worker processes.
+    """
+
+    def __init__(self, name, **params):
+        if name not in VALIDATORS:
+            raise ValueError(f"Unknown validator '{name}'. Available validators: {', '.join(sorted(VALIDATORS))}.")
+        if isinstance(params.get("pattern"), str):
+            # Check patterns when rules are resolved rather than fail the report on the first column
+            try:
+                re.compile(params["pattern"])
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression {params['pattern']!r} for validator '{name}': {e}")
+        self.name = name
+        self.params = params
+
+    def __call__(self, column):
+        return np.asarray(VALIDATORS[self.name](column, **self.params), dtype=bool)
+
+    def __repr__(self):
+        params = "".join(f", {key}={value!r}" for key, value in self.params.items())
+        return f"ColumnValidator({self.name!r}{params})"
+
+    # Validators with the same name and parameters are interchangeable, e.g. as cache keys
+    def __eq__(self, other):
+        return isinstance(other, ColumnValidator) and repr(self) == repr(other)
+
+    def __hash__(self):
+        return hash(repr(self))
+
+def resolve_validator(rule):
+    """
+    Turn one validity rule into something ValidityAccumulator can run.
+
+    A rule is a validator name ("email"), a dict naming the validator and its parameters
+    ({"validator": "range", "min": 0}), a ColumnValidator, or a per-value function.
+    """
+    if isinstance(rule, ColumnValidator) or callable(rule):
+        return rule
+    if isinstance(rule, str):
+        return ColumnValidator(rule)
+    if isinstance(rule, dict):
+        params = dict(rule)
+        name = params.pop("validator", None)
+        if name is None:
+            raise ValueError(f"Validity rule {rule!r} does not name a validator.")
+        return ColumnValidator(name, **params)
+    raise ValueError(f"Unsupported validity rule {rule!r}.")
+
+def resolve_validity_rules(validity_rules, columns):
+    """
+    Map columns to validators from a {column: rule} config.
+
+    Without a config, columns whose name contains "email" get the email validator, as before.
+    Columns without a rule are not checked for validity.
+    """
+    if validity_rules is None:
+        validity_rules = {col: "email" for col in columns if "email" in str(col).lower()}
+    return {col: resolve_validator(rule) for col, rule in validity_rules.items() if col in columns}
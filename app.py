@@ -1,71 +1,196 @@
-from flask import Flask, render_template, request, send_file
+from flask import Flask, Request, jsonify, render_template, request, send_file, url_for
+import json
 import os
-from Data_Validation.dataloD.data_loader import load_dataset
-from Data_Validation.dataquame.data_quality_metrics import calculate_scores, overall_quality_score
-from Data_Validation.datadetairep.detailed_report import generate_detailed_report
-from Data_Validation.dataquaclms.quality_summary import generate_quality_summary
-from Data_Validation.dataProfrep.data_profiling_report import generate_combined_report
+from Data_Validation.dataloD.upload_cache import CachedUpload, UploadCache
+from Data_Validation.dataloD.upload_stream import StreamingUpload
+from report_jobs import ReportJobQueue, build_report
+from workspaces import WorkspaceManager
+
+# Dataset formats accepted for upload, and compressed files, detected from their content when parsed
+UPLOAD_EXTENSIONS = ('.csv', '.tsv', '.txt', '.parquet', '.feather', '.arrow', '.ipc', '.gz', '.bz2', '.xz', '.zst', '.zip')
+
+class UploadRequest(Request):
+    """
+    Request whose uploaded files are hashed while they are received.
+
+    Each file part is written into a StreamingUpload instead of a temporary file, which saves it
+    to the request's workspace and hashes it on the way. The report job parses the saved file,
+    unless the upload cache already holds the same bytes parsed, so the request returns as soon
+    as the upload is received.
+    """
+
+    # Folder the raw uploads are saved to, set by the view before the form is parsed
+    upload_tee_dir = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streamed_uploads = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        tee_path = None
+        if self.upload_tee_dir is not None:
+            # Keep the extension of known formats only, the name itself is chosen by the client
+            extension = os.path.splitext(filename or '')[1].lower()
+            if extension not in UPLOAD_EXTENSIONS:
+                extension = ''
+            tee_path = os.path.join(self.upload_tee_dir, f'dataset{len(self.streamed_uploads) + 1}{extension}')
+        upload = StreamingUpload(tee_path)
+        self.streamed_uploads.append(upload)
+        return upload
+
+    def close(self):
+        # Close the saved files of aborted uploads
+        for upload in self.streamed_uploads:
+            upload.finish()
+        super().close()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 # Folder for uploading files
 UPLOAD_FOLDER = 'uploads'
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-# Ensure the upload folder exists
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Every request gets a private workspace for its uploads and report, removed once it is older
+# than WORKSPACE_MAX_AGE seconds or when all workspaces together exceed WORKSPACE_MAX_BYTES, unless
+# its job is still queued or running and started less than WORKSPACE_MAX_JOB_AGE seconds ago
+app.config['WORKSPACE_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'workspaces')
+app.config['WORKSPACE_MAX_AGE'] = 24 * 3600
+app.config['WORKSPACE_MAX_BYTES'] = 10 * 1024 ** 3
+app.config['WORKSPACE_MAX_JOB_AGE'] = 6 * 3600
+workspaces = WorkspaceManager(
+    app.config['WORKSPACE_FOLDER'], app.config['WORKSPACE_MAX_AGE'], app.config['WORKSPACE_MAX_BYTES'],
+    max_job_seconds=app.config['WORKSPACE_MAX_JOB_AGE'],
+)
+
+# Parsed uploads cached by content, so resubmitted files are not parsed again
+app.config['CACHE_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'cache')
+app.config['CACHE_MAX_BYTES'] = 2 * 1024 ** 3
+upload_cache = UploadCache(app.config['CACHE_FOLDER'], app.config['CACHE_MAX_BYTES'])
+
+# Reports are built by a local pool of worker processes, so requests return immediately
+app.config['REPORT_WORKERS'] = None  # One per CPU
+report_jobs = ReportJobQueue(app.config['REPORT_WORKERS'], app.config['WORKSPACE_MAX_AGE'])
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
     return render_template('index.html')
 
+def received_upload(upload):
+    """
+    Reference to a received StreamingUpload for the report job: its upload cache entry, parsed
+    by the job from the file saved in the workspace when the entry is missing.
+    """
+    upload.finish()
+    return CachedUpload(upload_cache.make_key(upload.digest), upload.tee_path)
+
 @app.route('/generate_report', methods=['POST'])
 def generate_report():
+    workspace = None
     try:
-        # Get the uploaded files
+        # Give the request a workspace of its own, so concurrent requests never share paths
+        workspace = workspaces.create()
+        workspace.mark_active()
+        request.upload_tee_dir = workspace.path
+
+        # Get the uploaded files, saved and hashed while they were received
         file1 = request.files['file1']
         file2 = request.files['file2']
-        
-        # Save the files locally
-        dataset_path1 = os.path.join(app.config['UPLOAD_FOLDER'], 'dataset1.csv')
-        dataset_path2 = os.path.join(app.config['UPLOAD_FOLDER'], 'dataset2.csv')
-        
-        file1.save(dataset_path1)
-        file2.save(dataset_path2)
-
-        # Load the datasets
-        df1 = load_dataset(dataset_path1)
-        df2 = load_dataset(dataset_path2)
-
-        # Validate if the datasets are loaded properly
-        if df1 is None or df1.empty:
-            raise ValueError(f"The dataset at {dataset_path1} is empty or failed to load. Check the file path and content.")
-        if df2 is None or df2.empty:
-            raise ValueError(f"The dataset at {dataset_path2} is empty or failed to load. Check the file path and content.")
-
-        # Step 2: Calculate detailed scores for each column
-        detailed_scores_df = calculate_scores(df1, df2)
 
-        # Step 3: Calculate the overall data quality score
-        overall_score = overall_quality_score(detailed_scores_df)
-
-        # Step 4: Generate the detailed report content
-        detailed_report_content = generate_detailed_report(df1, detailed_scores_df, overall_score)
-
-        # Step 5: Generate the quality summary content
-        quality_summary_content = generate_quality_summary(df1, detailed_scores_df)
-
-        # Step 6: Generate the combined report with all sections
-        output_path = os.path.join('static', 'combined_data_quality_report.html')
-        generate_combined_report(df1, detailed_report_content, quality_summary_content, output_path)
-
-        # Open the generated HTML report in the browser
-        return render_template('report_viewer.html', report_path=output_path)
+        # Optional HyperLogLog error bound for approximate distinct counts, exact when empty
+        distinct_error = request.form.get('distinct_error')
+        distinct_error = float(distinct_error) if distinct_error else None
+
+        # Optional sample size to estimate the scores from, exact when empty, and column to stratify it by
+        sample_size = request.form.get('sample_size')
+        sample_size = int(sample_size) if sample_size else None
+        stratify_by = request.form.get('stratify_by', '').strip() or None
+
+        # Optional comma-separated key columns the datasets are aligned on, by row position when empty
+        join_keys = [key.strip() for key in request.form.get('join_keys', '').split(',') if key.strip()] or None
+
+        # Optional comma-separated columns compared to find near-duplicate rows, exact duplicates only when empty
+        near_duplicate_columns = [
+            column.strip() for column in request.form.get('near_duplicate_columns', '').split(',') if column.strip()
+        ] or None
+
+        # Optional JSON mapping of columns to validators, e.g. {"email": "email"}
+        validity_rules = request.form.get('validity_rules', '').strip()
+        validity_rules = json.loads(validity_rules) if validity_rules else None
+
+        # Hand the datasets to the job, which parses them and fills the cache, or reads back the
+        # cached frames of files uploaded before
+        datasets = [received_upload(file1.stream), received_upload(file2.stream)]
+
+        # Queue the report under the workspace id and answer straight away with it
+        job_id = report_jobs.submit(
+            build_report, datasets[0], datasets[1], workspace.report_path,
+            distinct_error=distinct_error, validity_rules=validity_rules,
+            sample_size=sample_size, stratify_by=stratify_by, join_keys=join_keys,
+            near_duplicate_columns=near_duplicate_columns, cache_dir=app.config['CACHE_FOLDER'], cache_max_bytes=app.config['CACHE_MAX_BYTES'],
+            job_id=workspace.id,
+        )
+        report_jobs.add_done_callback(job_id, workspace.mark_done)
+
+        if wants_json():
+            return jsonify(job_status(job_id)), 202
+        return render_template('job_status.html', job_id=job_id), 202
 
     except Exception as e:
+        if workspace is not None:
+            workspace.mark_done()
+        if wants_json():
+            return jsonify({"error": str(e)}), 400
         return f"An error occurred: {e}"
 
+def job_status(job_id):
+    """Status of a job with the URLs to poll it and fetch its report."""
+    status = report_jobs.status(job_id)
+    if status is None:
+        # The job may have been submitted to another app process sharing the workspaces
+        workspace = workspaces.get(job_id)
+        status = workspace.status() if workspace is not None else None
+    if status is not None:
+        status['status_url'] = url_for('get_job_status', job_id=job_id)
+        status['result_url'] = url_for('get_job_result', job_id=job_id)
+    return status
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    status = job_status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job '{job_id}'."}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    status = job_status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job '{job_id}'."}), 404
+    if status['status'] in ('queued', 'running'):
+        return jsonify(status), 409
+    if status['status'] == 'failed':
+        if wants_json():
+            return jsonify(status), 500
+        return f"An error occurred: {status['error']}"
+
+    # Open the generated HTML report in the browser
+    report_url = url_for('get_job_report', job_id=job_id)
+    if wants_json():
+        return jsonify({**status, "report_url": report_url})
+    return render_template('report_viewer.html', report_url=report_url)
+
+@app.route('/jobs/<job_id>/report', methods=['GET'])
+def get_job_report(job_id):
+    workspace = workspaces.get(job_id)
+    if workspace is None or not os.path.exists(workspace.report_path):
+        return jsonify({"error": f"No report for job '{job_id}'."}), 404
+    return send_file(os.path.abspath(workspace.report_path), mimetype='text/html')
+
 if __name__ == "__main__":
     app.run(debug=True)
 
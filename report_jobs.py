@@ -0,0 +1,198 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+import pandas as pd
+
+# Reports are rendered in worker processes, ensure matplotlib works headless there
+matplotlib.use("Agg")
+
+from Data_Validation.dataloD.upload_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, UploadCache
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+from Data_Validation.dataquame.data_quality_metrics import calculate_scores, overall_quality_score
+from Data_Validation.dataquame.duplicates import find_duplicates
+from Data_Validation.dataquame.score_cache import ScoreCache
+from Data_Validation.datadetairep.chart_rendering import ChartCache
+from Data_Validation.datadetairep.detailed_report import generate_detailed_report
+from Data_Validation.dataquaclms.quality_summary import generate_quality_summary
+from Data_Validation.dataProfrep.data_profiling_report import generate_combined_report
+
+# Per-column scores memoized across the jobs a worker process runs
+score_cache = ScoreCache()
+
+# Rendered per-column charts memoized across the jobs a worker process runs
+chart_cache = ChartCache()
+
+def load_report_dataset(upload_cache, dataset):
+    """Load one report input (path, CachedUpload or DataFrame) and check that it is not empty."""
+    df = dataset if isinstance(dataset, pd.DataFrame) else upload_cache.load(dataset)
+    if df is None or df.empty:
+        if isinstance(dataset, pd.DataFrame):
+            raise ValueError("An uploaded dataset is empty. Check the file content.")
+        raise ValueError(f"The dataset at {dataset} is empty or failed to load. Check the file path and content.")
+    return df
+
+def build_report(dataset1, dataset2, output_path, distinct_error=None, validity_rules=None, sample_size=None,
+                 stratify_by=None, join_keys=None, near_duplicate_columns=None, chart_jobs=None,
+                 cache_dir=DEFAULT_CACHE_DIR, cache_max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Runs the whole report pipeline for two datasets and writes the combined HTML report.
+
+    Args:
+        dataset1: Dataset being assessed, as a file path, a CachedUpload or an already parsed DataFrame.
+        dataset2: Reference dataset, in any of the same forms.
+        output_path (str): Where the combined HTML report is written.
+        distinct_error (float, optional): Error bound for approximate distinct counts, exact when None.
+        validity_rules (dict, optional): Maps columns to validators, see calculate_scores.
+        sample_size (int, optional): Estimate the scores from a sample of this many rows, exact when None.
+        stratify_by (str, optional): Column the sample is drawn within, uniform when None.
+        join_keys (list, optional): Key columns the datasets are aligned on, by row position when None.
+        near_duplicate_columns (list, optional): Columns compared to find near-duplicate rows, exact
+            duplicates only when None.
+        chart_jobs (int, optional): Worker processes rendering the per-column charts, all CPUs with -1,
+            serially when None. Report jobs already run one per CPU, so they render serially by default.
+        cache_dir (str): Folder of the parsed-upload cache shared by all workers.
+        cache_max_bytes (int): Size cap of the parsed-upload cache.
+
+    Returns:
+        str: output_path, once the report has been written.
+    """
+    upload_cache = UploadCache(cache_dir, cache_max_bytes)
+
+    # Step 1: Load and validate both datasets concurrently, from the cache when the same file was
+    # uploaded or parsed before. Cache reads and the C parts of parsing release the GIL.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        df1, df2 = pool.map(lambda dataset: load_report_dataset(upload_cache, dataset), (dataset1, dataset2))
+
+    # Null masks, factorized codes and duplicates of df1 are computed once and shared by every step
+    context = AnalysisContext(df1)
+
+    # Step 2: Calculate detailed scores for each column
+    detailed_scores_df = calculate_scores(
+        df1, df2, distinct_error=distinct_error, validity_rules=validity_rules, score_cache=score_cache,
+        sample_size=sample_size, stratify_by=stratify_by, join_keys=join_keys, context=context,
+    )
+
+    # Step 3: Calculate the overall data quality score
+    overall_score = overall_quality_score(detailed_scores_df)
+
+    # Find clusters of exact and near-duplicate rows for the detailed report
+    duplicates = find_duplicates(df1, near_duplicate_columns, context)
+
+    # Step 4: Generate the detailed report content
+    detailed_report_content = generate_detailed_report(
+        df1, detailed_scores_df, overall_score, context, duplicates, n_jobs=chart_jobs, chart_cache=chart_cache
+    )
+
+    # Step 5: Generate the quality summary content
+    quality_summary_content = generate_quality_summary(df1, detailed_scores_df)
+
+    # Step 6: Generate the combined report with all sections
+    generate_combined_report(df1, detailed_report_content, quality_summary_content, output_path, distinct_error, context)
+
+    return output_path
+
+class ReportJobQueue:
+    """
+    In-process queue running report jobs on a local pool of worker processes.
+
+    Jobs are identified by a random id and their status can be polled while they run. Finished
+    jobs are forgotten after `retention_seconds`. When a worker dies, the jobs it took down with
+    the pool fail and the next job starts a new pool.
+    """
+
+    def __init__(self, max_workers=None, retention_seconds=24 * 3600):
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Workers are only started on the first job, not when the app module is imported
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers)
+        return self._executor
+
+    def _discard_executor(self, executor):
+        """Forget a broken pool, unless it was already replaced, so the next job starts a new one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _job_done(self, job_id, executor, future):
+        if isinstance(future.exception(), BrokenProcessPool):
+            self._discard_executor(executor)
+        self._mark_finished(job_id)
+
+    def submit(self, function, *args, job_id=None, **kwargs):
+        """Queue function(*args, **kwargs) and return the id of the new job, random unless given."""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            executor = self._get_executor()
+            try:
+                future = executor.submit(function, *args, **kwargs)
+            except BrokenProcessPool:
+                # The pool broke before its failed jobs reported it, run this job on a new one
+                executor.shutdown(wait=False)
+                self._executor = None
+                executor = self._get_executor()
+                future = executor.submit(function, *args, **kwargs)
+            self._jobs[job_id] = {"future": future, "submitted_at": time.time(), "finished_at": None}
+        future.add_done_callback(lambda _: self._job_done(job_id, executor, future))
+        return job_id
+
+    def add_done_callback(self, job_id, callback):
+        """Call callback(status) once the job has finished or failed, right away if it already has."""
+        with self._lock:
+            future = self._jobs[job_id]["future"]
+        future.add_done_callback(lambda _: callback(self.status(job_id)))
+
+    def _mark_finished(self, job_id):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id]["finished_at"] = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def status(self, job_id):
+        """Return a JSON-ready status dict for job_id, or None if the job is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        future = job["future"]
+        status = {"job_id": job_id, "submitted_at": job["submitted_at"], "finished_at": job["finished_at"]}
+        if not future.done():
+            status["status"] = "running" if future.running() else "queued"
+        elif future.exception() is not None:
+            status["status"] = "failed"
+            status["error"] = str(future.exception())
+        else:
+            status["status"] = "finished"
+        return status
+
+    def result(self, job_id):
+        """Return the result of a finished job, re-raising its exception if it failed."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job["future"].result(timeout=0)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
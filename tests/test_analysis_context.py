@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+
+def test_duplicated_rows_match_pandas_for_signed_zeros_and_nan():
+    df = pd.DataFrame({"a": [0.0, -0.0, np.nan, np.nan, 1.5, 1.5, 2], "b": [1, 1, 1, 1, 2, 2, 3]})
+    assert AnalysisContext(df).duplicated_row_count() == df.duplicated().sum() == 3
+
+def test_duplicated_rows_match_pandas_for_mixed_object_columns():
+    df = pd.DataFrame({"a": [1, "1", 1.0, -0.0, 0, None, np.nan], "b": ["x"] * 7})
+    assert AnalysisContext(df).duplicated_row_count() == df.duplicated().sum()
+
+def test_distinct_cells_count_signed_zeros_once():
+    df = pd.DataFrame({"a": [0.0, -0.0, 1.0], "b": [-0.0, 2.0, 2.0]})
+    assert AnalysisContext(df).distinct_cells() == pd.unique(df.to_numpy().ravel() + 0.0).size
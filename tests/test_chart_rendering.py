@@ -0,0 +1,16 @@
+import pandas as pd
+
+from Data_Validation.datadetairep.chart_rendering import ChartCache, render_charts
+
+def test_unchanged_columns_are_read_from_the_cache():
+    metrics = ["Completeness", "Validity"]
+    scores = pd.DataFrame({"Completeness": [100.0, 50.0], "Validity": [90.0, 10.0]}, index=["a", "b"])
+    cache = ChartCache()
+    first = render_charts(scores, metrics, chart_cache=cache)
+
+    scores.loc["b", "Validity"] = 20.0
+    second = render_charts(scores, metrics, chart_cache=cache)
+
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert second["a"] == first["a"]
+    assert second["b"] != first["b"]
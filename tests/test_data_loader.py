@@ -0,0 +1,134 @@
+import bz2
+import gzip
+import lzma
+import zipfile
+
+import pandas as pd
+import pytest
+
+from Data_Validation.dataloD.data_loader import DatasetChunks, load_dataset
+
+@pytest.fixture
+def late_text_csv(tmp_path):
+    # Digits well past pyarrow's first block, then a value that is not a number
+    path = tmp_path / "late_text.csv"
+    codes = [str(i) for i in range(300_000)] + ["abc"]
+    pd.DataFrame({"code": codes, "amount": range(len(codes))}).to_csv(path, index=False)
+    return path
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+def test_streaming_column_whose_type_changes_after_first_block(late_text_csv, engine):
+    chunks = list(DatasetChunks(late_text_csv, chunksize=50_000, engine=engine, infer_dtypes=False))
+    streamed = pd.concat(chunks)
+    loaded = load_dataset(late_text_csv, infer_dtypes=False)
+
+    assert len(streamed) == len(loaded) == 300_001
+    assert streamed["code"].astype(str).tolist() == loaded["code"].astype(str).tolist()
+    assert streamed["amount"].tolist() == loaded["amount"].tolist()
+    # Chunks are typed on their own, as the C parser does
+    assert pd.api.types.is_integer_dtype(chunks[0]["code"])
+    assert chunks[-1]["code"].iloc[-1] == "abc"
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_filters_on_columns_that_are_not_loaded(tmp_path, file_format):
+    df = pd.DataFrame({"a": range(10), "b": range(-5, 5)})
+    path = tmp_path / f"dataset.{file_format}"
+    getattr(df, f"to_{file_format}")(path, index=False)
+
+    loaded = load_dataset(path, columns=["a"], filters=[("b", ">", 0)])
+    streamed = pd.concat(load_dataset(path, chunksize=3, columns=["a"], filters=[("b", ">", 0)]))
+
+    assert loaded.to_dict("list") == {"a": [6, 7, 8, 9]}
+    assert streamed.to_dict("list") == {"a": [6, 7, 8, 9]}
+
+def test_dates_are_only_parsed_on_request():
+    path = "Data_Validation/Ds'S/dataset_with_issues.csv"
+    assert not pd.api.types.is_datetime64_any_dtype(load_dataset(path)["purchase_date"])
+    assert pd.api.types.is_datetime64_any_dtype(load_dataset(path, parse_dates=True)["purchase_date"])
+
+# A row with extra fields right after the header and another later, a blank line, a short row
+# and a quoted line break
+MALFORMED_CSV = b'a,b\nt,u,v\nr,s\nw,x\ny,z,p,q\n\nshort\n"multi\nline",o\n'
+
+@pytest.mark.parametrize("engine", ["pyarrow", "c"])
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 100])
+def test_malformed_rows_are_handled_alike_by_every_engine_and_chunk_size(tmp_path, engine, chunksize):
+    path = tmp_path / "malformed.csv"
+    path.write_bytes(MALFORMED_CSV)
+    chunks = DatasetChunks(path, chunksize=chunksize, engine=engine, infer_dtypes=False)
+    streamed = pd.concat(list(chunks))
+    loaded = load_dataset(path, infer_dtypes=False)
+
+    # Rows with extra fields are skipped and counted, short rows are padded
+    expected = [["r", "s"], ["w", "x"], ["short", None], ["multi\nline", "o"]]
+    assert streamed.astype(object).where(streamed.notna(), None).values.tolist() == expected
+    assert loaded.astype(object).where(loaded.notna(), None).values.tolist() == expected
+    assert chunks.bad_lines == 2
+    assert streamed.index.tolist() == list(range(4))
+
+def test_pyarrow_hands_short_rows_over_to_the_c_parser(tmp_path):
+    # The short row comes after pyarrow has yielded several chunks
+    lines = [f"{i},{i}" for i in range(200_000)] + ["7", "1,2,3"] + [f"{i},{i}" for i in range(1_000)]
+    path = tmp_path / "late_short_row.csv"
+    path.write_text("a,b\n" + "\n".join(lines) + "\n")
+
+    streamed = {}
+    for engine in ("pyarrow", "c"):
+        chunks = DatasetChunks(path, chunksize=30_000, engine=engine, infer_dtypes=False)
+        streamed[engine] = pd.concat(list(chunks))
+        assert chunks.bad_lines == 1
+    loaded = load_dataset(path, infer_dtypes=False)
+
+    assert len(streamed["pyarrow"]) == len(streamed["c"]) == len(loaded) == 201_001
+    assert streamed["pyarrow"].index.tolist() == list(range(201_001))
+    assert streamed["pyarrow"]["b"].reset_index(drop=True).equals(streamed["c"]["b"].reset_index(drop=True))
+    assert pd.isna(streamed["pyarrow"]["b"].iloc[200_000])
+
+@pytest.mark.parametrize("sep", ["\t", ";", "|"])
+def test_delimiter_and_encoding_are_sniffed(tmp_path, sep):
+    rows = [["name", "city", "amount"], ["Zoë", "Köln", "1,5"], ["Renée", "Besançon", "2,25"]]
+    path = tmp_path / "dataset.csv"
+    path.write_bytes("\n".join(sep.join(row) for row in rows).encode("cp1252") + b"\n")
+
+    df = load_dataset(path, infer_dtypes=False)
+    assert df.columns.tolist() == rows[0]
+    assert df.values.tolist() == rows[1:]
+    streamed = pd.concat(list(DatasetChunks(path, chunksize=1, engine="c", infer_dtypes=False)))
+    assert streamed.values.tolist() == rows[1:]
+
+def _compress(path, compression, data):
+    if compression == "zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("dataset.csv", data)
+    else:
+        with {"gzip": gzip, "bz2": bz2, "xz": lzma}[compression].open(path, "wb") as file:
+            file.write(data)
+
+@pytest.mark.parametrize("compression", ["gzip", "bz2", "xz", "zip"])
+def test_compressed_files_load_like_the_uncompressed_file(tmp_path, compression):
+    data = "".join(f"{i},{'abc'[i % 3]},{i / 4}\n" for i in range(5_000)).encode()
+    plain = tmp_path / "dataset.csv"
+    plain.write_bytes(b"id,code,value\n" + data)
+    compressed = tmp_path / f"dataset.csv.{compression}"
+    _compress(compressed, compression, b"id,code,value\n" + data)
+
+    expected = load_dataset(plain)
+    pd.testing.assert_frame_equal(load_dataset(compressed), expected)
+    with open(compressed, "rb") as stream:
+        pd.testing.assert_frame_equal(load_dataset(stream), expected)
+    streamed = pd.concat(list(load_dataset(compressed, chunksize=1_000)))
+    pd.testing.assert_frame_equal(streamed, pd.concat(list(load_dataset(plain, chunksize=1_000))))
+
+def test_inferred_dtypes_keep_values_and_save_memory(tmp_path):
+    rows = [f"{i},{i * 70_000},{i / 8},{0.1 * i},{'xyz'[i % 3]}" for i in range(2_000)]
+    path = tmp_path / "dataset.csv"
+    path.write_text("small,large,exact,inexact,code\n" + "\n".join(rows) + "\n")
+
+    compact = load_dataset(path)
+    wide = load_dataset(path, infer_dtypes=False)
+    assert compact["small"].dtype == "int16" and compact["large"].dtype == "int32"
+    # Eighths are exact in float32, tenths are not and stay float64
+    assert compact["exact"].dtype == "float32" and compact["inexact"].dtype == "float64"
+    for column in wide.columns:
+        assert (compact[column].astype(wide[column].dtype) == wide[column]).all()
+    assert compact.memory_usage(deep=True).sum() < wide.memory_usage(deep=True).sum()
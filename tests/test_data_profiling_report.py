@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataProfrep.data_profiling_report import generate_statistics
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+
+def _frame():
+    rng = np.random.default_rng(3)
+    ids = rng.integers(0, 30_000, 50_000).astype(float)
+    ids[rng.random(len(ids)) < 0.1] = np.nan
+    return pd.DataFrame({"id": ids, "group": rng.choice(list("abc"), len(ids))})
+
+def test_exact_statistics_match_pandas():
+    df = _frame()
+    statistics = generate_statistics(df)
+    assert statistics["Distinct Values"].tolist() == df.nunique().tolist()
+    assert statistics["Missing Cells"].tolist() == df.isna().sum().tolist()
+    assert statistics["Duplicate Values"].tolist() == [df[column].duplicated().sum() for column in df.columns]
+    assert not statistics.attrs["distinct_approximate"]
+
+def test_approximate_distinct_counts_within_error_without_distinct_sets():
+    df = _frame()
+    context = AnalysisContext(df)
+    statistics = generate_statistics(df, distinct_error=0.01, context=context)
+
+    exact = df.nunique()
+    assert (abs(statistics["Distinct Values"] - exact) <= 3 * 0.01 * exact).all()
+    assert statistics.attrs["distinct_approximate"]
+    assert not any(key[0] in ("distinct_values", "codes") for key in context._cache)
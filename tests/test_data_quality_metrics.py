@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.analysis_context import AnalysisContext
+from Data_Validation.dataquame.data_quality_metrics import calculate_scores
+from Data_Validation.dataquame.metric_accumulators import QUANTILE_SKETCH_K
+from Data_Validation.dataquame.sketches import kll_rank_error
+
+def _mixed_frames(n=3_000):
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "amount": np.where(rng.random(n) < 0.1, np.nan, rng.integers(0, 50, n).astype(float)),
+        "email": rng.choice(["a@b.com", "not an email", None], n),
+        "updated": pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 4_000, n), unit="D"),
+        "status": rng.choice(["open", "closed", None], n),
+    })
+    df2 = df.copy()
+    changed = rng.random(n) < 0.3
+    df2.loc[changed, "amount"] = np.nan
+    df2.loc[changed, "status"] = "pending"
+    return df, df2
+
+def test_chunked_scores_equal_whole_frame_scores():
+    df, df2 = _mixed_frames()
+    scores = calculate_scores(df, df2, threshold_date="2023-01-01")
+    chunked = calculate_scores(df, df2, threshold_date="2023-01-01", chunksize=700)
+
+    # Every metric but the sketched Reliability is merged from exact counts
+    exact_metrics = [metric for metric in scores.columns if metric != "Reliability"]
+    pd.testing.assert_frame_equal(chunked[exact_metrics], scores[exact_metrics])
+
+def _reliability(column):
+    q1, q3 = column.quantile(0.25), column.quantile(0.75)
+    iqr = q3 - q1
+    return column.between(q1 - 1.5 * iqr, q3 + 1.5 * iqr).sum() / len(column) * 100
+
+def test_reliability_in_memory_is_exact_and_chunked_is_repeatable():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=20_000)
+    values[rng.random(len(values)) < 0.05] = np.nan
+    df = pd.DataFrame({"x": values})
+    exact = _reliability(df["x"])
+
+    scores = calculate_scores(df, df)
+    assert scores.loc["x", "Reliability"] == exact
+    assert "Reliability" not in scores.attrs["approximate"]
+
+    chunked = calculate_scores(df, df, chunksize=3_000)
+    assert chunked.loc["x", "Reliability"] == calculate_scores(df, df, chunksize=3_000).loc["x", "Reliability"]
+    assert abs(chunked.loc["x", "Reliability"] - exact) <= 2 * kll_rank_error(QUANTILE_SKETCH_K) * 100
+    assert "Reliability" in chunked.attrs["approximate"]
+
+def test_approximate_uniqueness_within_error_without_distinct_sets():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"id": rng.integers(0, 30_000, 50_000)})
+    context = AnalysisContext(df)
+    scores = calculate_scores(df, df, distinct_error=0.01, context=context)
+
+    exact = df["id"].nunique() / len(df) * 100
+    assert abs(scores.loc["id", "Uniqueness"] - exact) <= 3 * 0.01 * exact
+    assert ("distinct_values", "id") not in context._cache
+
+def test_parallel_scores_equal_serial_scores():
+    df, df2 = _mixed_frames()
+    scores = calculate_scores(df, df2, threshold_date="2023-01-01")
+    pd.testing.assert_frame_equal(calculate_scores(df, df2, threshold_date="2023-01-01", n_jobs=2), scores)
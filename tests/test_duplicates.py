@@ -0,0 +1,39 @@
+import string
+
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.duplicates import find_duplicates
+
+def _people(rng, count):
+    letters = np.array(list(string.ascii_lowercase))
+    first = ["".join(word) for word in letters[rng.integers(0, 26, (count, 6))]]
+    last = ["".join(word) for word in letters[rng.integers(0, 26, (count, 8))]]
+    return pd.DataFrame({
+        "name": [f"{f.capitalize()} {l.capitalize()}" for f, l in zip(first, last)],
+        "email": [f"{f}.{l}@mail.com" for f, l in zip(first, last)],
+    })
+
+def test_exact_duplicates_match_pandas():
+    rng = np.random.default_rng(1)
+    df = _people(rng, 500)
+    df = pd.concat([df, df.iloc[rng.integers(0, 500, 40)]], ignore_index=True)
+    exact = find_duplicates(df)["exact"]
+    assert exact["rows"] - exact["clusters"] == df.duplicated().sum()
+
+def test_near_duplicate_recall_on_seeded_typos():
+    rng = np.random.default_rng(0)
+    people = _people(rng, 2_000)
+    sources = rng.choice(len(people), 200, replace=False)
+    typos = people.iloc[sources].copy()
+    # Drop one letter of the first name, the email is unchanged
+    typos["name"] = [name[:2] + name[3:] for name in typos["name"]]
+    df = pd.concat([people, typos], ignore_index=True)
+
+    near = find_duplicates(df, ["name", "email"], seed=0)["near"]
+
+    # Nearly all planted pairs are found, and the clusters listed are planted pairs
+    assert near["rows"] == 2 * near["clusters"]
+    assert 0.95 * len(sources) <= near["clusters"] <= len(sources)
+    planted = {(source, len(people) + position) for position, source in enumerate(sources)}
+    assert all(tuple(cluster) in planted for cluster in near["largest"])
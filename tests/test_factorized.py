@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Data_Validation.dataquame.factorized import map_distinct, transform_distinct
+
+@pytest.mark.parametrize("column", [
+    pd.Series(["a@b.com", "bad", None, "a@b.com", np.nan, "bad"]),
+    pd.Series([1, 1.0, True, "1", None]),
+    pd.Series([1.5, np.nan, 1.5, -0.0, 0.0]),
+    pd.Series([-0.0, None, 0.0], dtype=object),
+    pd.Series(["x", "y", "x"], dtype="category"),
+    pd.Series([[1], [1], None]),
+    pd.Series([], dtype=object),
+])
+def test_map_distinct_matches_apply(column):
+    assert map_distinct(column, repr).tolist() == column.apply(repr).tolist()
+
+def test_transform_runs_once_per_distinct_value():
+    column = pd.Series(["b", "a", None, "b", "a", "b"], index=list("uvwxyz"))
+    seen = []
+
+    def upper(values):
+        seen.extend(values.tolist())
+        return values.str.upper()
+
+    result = transform_distinct(column, upper)
+    assert seen == ["b", "a", None]
+    assert result.index.equals(column.index)
+    assert result.tolist() == ["B", "A", None, "B", "A", "B"]
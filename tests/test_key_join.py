@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Data_Validation.dataquame.key_join import HashJoin, SortMergeJoin
+
+def _datasets(seed, rows=5_000):
+    rng = np.random.default_rng(seed)
+    left = pd.DataFrame({"key": rng.integers(0, 3_000, rows).astype(float), "left_row": np.arange(rows)})
+    right = pd.DataFrame({"key": rng.integers(0, 3_000, rows).astype(float), "right_row": np.arange(rows)})
+    left.loc[rng.random(rows) < 0.02, "key"] = np.nan
+    right.loc[rng.random(rows) < 0.02, "key"] = np.nan
+    return left, right
+
+def _expected_pairs(left, right):
+    """Rows of equal keys paired by order of occurrence with pandas.merge, missing keys never match."""
+    def numbered(frame):
+        frame = frame.dropna(subset=["key"])
+        return frame.assign(occurrence=frame.groupby("key").cumcount())
+    matched = numbered(left).merge(numbered(right), on=["key", "occurrence"])
+    return set(zip(matched["left_row"], matched["right_row"]))
+
+def _joined_pairs(join):
+    pairs, left_only = set(), 0
+    for left, right in join:
+        if right is None:
+            left_only += len(left)
+        else:
+            pairs |= set(zip(left["left_row"], right["right_row"]))
+    return pairs, left_only
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_hash_and_sort_merge_joins_pair_rows_like_pandas_merge(tmp_path, seed):
+    left, right = _datasets(seed)
+    expected = _expected_pairs(left, right)
+
+    hash_join = HashJoin(left, right, ["key"], chunksize=1_000)
+    chunks = lambda frame: (frame.iloc[start:start + 700] for start in range(0, len(frame), 700))
+    sort_merge = SortMergeJoin(chunks(left), chunks(right), ["key"], spill_dir=str(tmp_path), batch_rows=256)
+
+    for join in (hash_join, sort_merge):
+        pairs, left_only = _joined_pairs(join)
+        assert pairs == expected
+        assert join.counts == {
+            "matched": len(expected),
+            "left_only": len(left) - len(expected),
+            "right_only": len(right) - len(expected),
+        }
+        assert left_only == len(left) - len(expected)
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pytest
+
+from report_jobs import ReportJobQueue, build_report
+
+def _wait(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while queue.status(job_id)["status"] in ("queued", "running"):
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.05)
+    return queue.status(job_id)
+
+def test_jobs_run_on_a_new_pool_after_a_worker_dies():
+    queue = ReportJobQueue(max_workers=1)
+    try:
+        crashed = queue.submit(os._exit, 1)
+        assert _wait(queue, crashed)["status"] == "failed"
+
+        job_id = queue.submit(int, "7")
+        assert _wait(queue, job_id)["status"] == "finished"
+        assert queue.result(job_id) == 7
+    finally:
+        queue.shutdown()
+
+def test_report_is_built_from_two_dataset_files(tmp_path):
+    (tmp_path / "assessed.csv").write_text("id,email\n1,a@b.com\n2,bad\n3,c@d.org\n")
+    (tmp_path / "reference.csv").write_text("id,email\n1,a@b.com\n2,b@c.com\n3,c@d.org\n")
+    output_path = build_report(
+        tmp_path / "assessed.csv", tmp_path / "reference.csv", tmp_path / "report.html", cache_dir=tmp_path / "cache"
+    )
+    assert "email" in (tmp_path / "report.html").read_text()
+    assert output_path == tmp_path / "report.html"
+
+def test_an_empty_reference_dataset_fails_the_report(tmp_path):
+    (tmp_path / "assessed.csv").write_text("id,email\n1,a@b.com\n")
+    (tmp_path / "empty.csv").write_text("id,email\n")
+    with pytest.raises(ValueError, match="empty.csv"):
+        build_report(
+            tmp_path / "assessed.csv", tmp_path / "empty.csv", tmp_path / "report.html", cache_dir=tmp_path / "cache"
+        )
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from Data_Validation.dataquame.data_quality_metrics import calculate_scores
+from Data_Validation.dataquame.metric_accumulators import SampledScoreAccumulator
+
+THRESHOLD_DATE = "2025-01-01"
+
+def _dataset(rng, count):
+    df = pd.DataFrame({
+        "a": np.where(rng.random(count) < .1, np.nan, rng.random(count)),
+        "g": rng.choice(["x", "y", "z"], count, p=[.9, .09, .01]),
+        "d": pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 800, count), "D"),
+    })
+    reference = df.copy()
+    reference.loc[rng.random(count) < .3, "a"] = 0.5
+    return df, reference
+
+def test_stratified_intervals_cover_full_scores():
+    df, reference = _dataset(np.random.default_rng(0), 50_000)
+    exact = calculate_scores(df, reference, threshold_date=THRESHOLD_DATE)
+    sampled = SampledScoreAccumulator(df.columns, 2_000, THRESHOLD_DATE, stratify_by="g", seed=1)
+    intervals = sampled.update(df, reference).finalize().attrs["confidence_intervals"]
+    assert intervals
+    for col, metrics in intervals.items():
+        for metric, (low, high) in metrics.items():
+            assert low - 1e-9 <= exact.loc[col, metric] <= high + 1e-9, (col, metric)
+
+def test_unsampled_metrics_score_as_calculate_scores():
+    df, reference = _dataset(np.random.default_rng(2), 1_000)
+    exact = calculate_scores(df, reference, threshold_date=THRESHOLD_DATE)
+    sampled = calculate_scores(df, reference, threshold_date=THRESHOLD_DATE, sample_size=100)
+    # Timeliness cannot be checked on text, and gets the same score whether or not it was sampled
+    assert sampled.loc["g", "Timeliness"] == exact.loc["g", "Timeliness"]
+
+    # With no rows to sample, every column scores as when no chunk was accumulated
+    empty = df.iloc[:0]
+    assert calculate_scores(empty, empty, sample_size=10).equals(calculate_scores(empty, empty, chunksize=10))
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from Data_Validation.dataquame.data_quality_metrics import calculate_scores
+from Data_Validation.dataquame.score_cache import ScoreCache
+
+def test_datetime_columns_hit_the_cache_with_the_default_threshold():
+    df = pd.DataFrame({"day": pd.date_range("2020-01-01", periods=50), "amount": range(50)})
+    cache = ScoreCache()
+    first = calculate_scores(df, df.copy(), score_cache=cache)
+    second = calculate_scores(df, df.copy(), score_cache=cache)
+
+    assert cache.hits == 2
+    pd.testing.assert_frame_equal(first, second)
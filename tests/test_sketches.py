@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Data_Validation.dataquame.sketches import HyperLogLog, KLLSketch
+
+@pytest.mark.parametrize("distinct", [10, 5_000, 200_000])
+def test_hyperloglog_count_within_error_bound(distinct):
+    rng = np.random.default_rng(distinct)
+    values = pd.Series(rng.integers(0, distinct, 3 * distinct)).drop_duplicates()
+    sketch = HyperLogLog(error=0.01).update(pd.Series(np.repeat(values.to_numpy(), 3)))
+    # Four standard errors, so a correct sketch essentially never fails
+    assert abs(sketch.count() - len(values)) <= 4 * sketch.error * len(values) + 1
+
+def test_hyperloglog_keeps_the_largest_rank_of_repeated_registers():
+    hashes = np.array([1 << 40, 1 << 20, 1 << 40], dtype=np.uint64)
+    sketch = HyperLogLog(error=0.01).add_hashes(hashes)
+    # The leftmost 1-bit of 1 << 20 is 21 bits from the right of the remaining bits
+    assert sketch.registers[0] == (64 - sketch.precision) - 21 + 1
+
+def test_hyperloglog_merge_counts_the_union():
+    left = HyperLogLog(error=0.02).update(pd.Series(range(0, 60_000)))
+    right = HyperLogLog(error=0.02).update(pd.Series(range(40_000, 100_000)))
+    union = HyperLogLog(error=0.02).update(pd.Series(range(100_000)))
+    assert left.merge(right).count() == union.count()
+
+def test_kll_is_exact_until_compacted():
+    values = np.random.default_rng(0).normal(size=150)
+    sketch = KLLSketch(k=200).add_values(values)
+    assert sketch.is_exact
+    assert sketch.quantile(0.3) == pytest.approx(np.quantile(values, 0.3))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_kll_quantiles_within_rank_error(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(size=100_000)
+    sketch = KLLSketch(k=200, seed=seed)
+    # Merged from parts, as chunked scoring builds it
+    for part in np.array_split(values, 7):
+        sketch.merge(KLLSketch(k=200, seed=seed).add_values(part))
+
+    ordered = np.sort(values)
+    assert sketch.count == len(values)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        rank = np.searchsorted(ordered, sketch.quantile(q), side="right") / len(values)
+        assert abs(rank - q) <= 2 * sketch.rank_error
+
+def test_kll_count_between_within_rank_error():
+    values = np.random.default_rng(5).uniform(0, 1, 50_000)
+    sketch = KLLSketch(k=200, seed=5).add_values(values)
+    actual = ((values >= 0.2) & (values <= 0.6)).sum()
+    assert abs(sketch.count_between(0.2, 0.6) - actual) <= 2 * sketch.rank_error * len(values)
@@ -0,0 +1,18 @@
+import os
+
+import pandas as pd
+
+from Data_Validation.dataloD.upload_cache import CachedUpload, UploadCache, content_hash
+
+def test_evicted_upload_is_parsed_again_from_its_file(tmp_path):
+    path = tmp_path / "dataset.csv"
+    pd.DataFrame({"a": range(5), "b": list("vwxyz")}).to_csv(path, index=False)
+    cache = UploadCache(str(tmp_path / "cache"))
+    upload = CachedUpload(cache.make_key(content_hash(path)), str(path))
+
+    first = cache.load(upload)
+    os.remove(cache.path_for(upload.key))
+    again = cache.load(upload)
+
+    assert again.equals(first)
+    assert os.path.exists(cache.path_for(upload.key))
@@ -0,0 +1,18 @@
+import pandas as pd
+import pytest
+
+from Data_Validation.dataquame.validators import resolve_validator
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"(?!x).*", [True, False, True, False]),
+    (r"(a)\1", [False, False, True, False]),
+    (r"\d+", [False, False, False, False]),
+])
+def test_regex_validator_accepts_python_patterns(pattern, expected):
+    column = pd.Series(["abc", "xyz", "aab", None])
+    validator = resolve_validator({"validator": "regex", "pattern": pattern})
+    assert validator(column).tolist() == expected
+
+def test_invalid_regex_is_rejected_when_resolved():
+    with pytest.raises(ValueError, match="Invalid regular expression"):
+        resolve_validator({"validator": "regex", "pattern": "(unclosed"})
@@ -0,0 +1,42 @@
+import os
+import time
+
+from workspaces import ACTIVE_MARKER, CREATED_FILE, WorkspaceManager
+
+def test_cleanup_keeps_active_workspaces_and_ages_by_creation(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), max_age_seconds=60)
+    running = manager.create()
+    running.mark_active()
+    finished = manager.create()
+    fresh = manager.create()
+
+    # Both older ones were created long ago, files added since do not make them younger
+    for workspace in (running, finished):
+        with open(workspace.file_path(CREATED_FILE), "w") as f:
+            f.write(repr(time.time() - 3600))
+        open(workspace.file_path("report.html"), "w").close()
+
+    manager.cleanup()
+
+    assert os.path.isdir(running.path)
+    assert not os.path.isdir(finished.path)
+    assert os.path.isdir(fresh.path)
+
+def test_cleanup_removes_workspaces_left_active_too_long(tmp_path):
+    manager = WorkspaceManager(str(tmp_path), max_age_seconds=60, max_job_seconds=600)
+    running = manager.create()
+    running.mark_active()
+    orphaned = manager.create()
+    orphaned.mark_active()
+
+    long_ago = time.time() - 3600
+    for workspace in (running, orphaned):
+        with open(workspace.file_path(CREATED_FILE), "w") as f:
+            f.write(repr(long_ago))
+    # The process running this job died an hour ago without releasing the workspace
+    os.utime(orphaned.file_path(ACTIVE_MARKER), (long_ago, long_ago))
+
+    manager.cleanup()
+
+    assert os.path.isdir(running.path)
+    assert not os.path.isdir(orphaned.path)
@@ -0,0 +1,164 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+# Marker file kept in a workspace while its job is queued or running
+ACTIVE_MARKER = ".active"
+
+# Seconds after which a workspace is no longer protected by its marker, left behind by a dead process
+DEFAULT_MAX_JOB_SECONDS = 6 * 3600
+
+# Final job status, readable by every app process sharing the workspace root
+STATUS_FILE = "status.json"
+
+# Creation time of a workspace, the folder's mtime changes whenever files are added
+CREATED_FILE = ".created"
+
+# Workspace ids are generated by uuid4().hex, anything else is rejected
+_WORKSPACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class Workspace:
+    """A private folder holding one request's uploads and generated report."""
+
+    def __init__(self, workspace_id, path):
+        self.id = workspace_id
+        self.path = path
+
+    def file_path(self, name):
+        return os.path.join(self.path, name)
+
+    @property
+    def report_path(self):
+        return self.file_path("report.html")
+
+    def mark_active(self):
+        open(self.file_path(ACTIVE_MARKER), "w").close()
+
+    def mark_done(self, status=None):
+        """Record the final job status and release the workspace for cleanup."""
+        if status is not None:
+            tmp_path = self.file_path(STATUS_FILE + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.file_path(STATUS_FILE))
+        try:
+            os.remove(self.file_path(ACTIVE_MARKER))
+        except FileNotFoundError:
+            pass
+
+    def status(self):
+        """Return the status recorded by mark_done, "running" while still active, else None."""
+        try:
+            with open(self.file_path(STATUS_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        if os.path.exists(self.file_path(ACTIVE_MARKER)):
+            return {"job_id": self.id, "status": "running"}
+        return None
+
+class WorkspaceManager:
+    """
+    Creates per-request workspaces under a root folder and cleans up old ones.
+
+    Inactive workspaces older than max_age_seconds are deleted. If the remaining ones still use
+    more than max_bytes, the oldest inactive workspaces are deleted until they fit. Workspaces
+    whose job is queued or running are not deleted, unless they were marked active more than
+    max_job_seconds ago, as happens when the process running the job died. Cleanup runs at most
+    once per cleanup_interval seconds, when workspaces are created, and is safe to run from
+    several threads or processes at once.
+    """
+
+    def __init__(self, root, max_age_seconds=24 * 3600, max_bytes=10 * 1024 ** 3, cleanup_interval=60,
+                 max_job_seconds=DEFAULT_MAX_JOB_SECONDS):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.max_job_seconds = max_job_seconds
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def create(self):
+        self._maybe_cleanup()
+        workspace_id = uuid.uuid4().hex
+        path = os.path.join(self.root, workspace_id)
+        os.makedirs(path)
+        with open(os.path.join(path, CREATED_FILE), "w", encoding="utf-8") as f:
+            f.write(repr(time.time()))
+        return Workspace(workspace_id, path)
+
+    def get(self, workspace_id):
+        """Return the workspace with this id, or None if it does not exist."""
+        if not _WORKSPACE_ID.match(workspace_id):
+            return None
+        path = os.path.join(self.root, workspace_id)
+        if not os.path.isdir(path):
+            return None
+        return Workspace(workspace_id, path)
+
+    def _maybe_cleanup(self):
+        with self._lock:
+            if time.time() - self._last_cleanup < self.cleanup_interval:
+                return
+            self._last_cleanup = time.time()
+        self.cleanup()
+
+    @staticmethod
+    def _created(path):
+        """Creation time recorded in a workspace, its folder's mtime for workspaces without one."""
+        try:
+            with open(os.path.join(path, CREATED_FILE), encoding="utf-8") as f:
+                return float(f.read())
+        except (FileNotFoundError, ValueError):
+            return os.path.getmtime(path)
+
+    def _active(self, path, now):
+        """Whether the workspace's job is queued or running, and was marked so recently enough."""
+        try:
+            return now - os.path.getmtime(os.path.join(path, ACTIVE_MARKER)) <= self.max_job_seconds
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _disk_usage(path):
+        total = 0
+        for folder, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(folder, name))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def cleanup(self):
+        """Delete expired inactive workspaces, then the oldest inactive ones while over the disk quota."""
+        now = time.time()
+        workspaces = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not _WORKSPACE_ID.match(name) or not os.path.isdir(path):
+                continue
+            try:
+                created = self._created(path)
+            except FileNotFoundError:
+                continue
+            active = self._active(path, now)
+            if now - created > self.max_age_seconds and not active:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            workspaces.append((created, path, active, self._disk_usage(path)))
+
+        total = sum(size for _, _, _, size in workspaces)
+        for _, path, active, size in sorted(workspaces):
+            if total <= self.max_bytes:
+                break
+            if active:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size